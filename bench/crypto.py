@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# Benchmark the client script handshake and per-message MAC.
+# vcmp/crypto.py does not need the server, so it is loaded by path.
+import os
+import re
+import importlib.util
+from timeit import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load_crypto():
+    spec = importlib.util.spec_from_file_location('crypto', os.path.join(ROOT, 'vcmp', 'crypto.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def test_key(crypto):
+    # Same key as client_script/sqrsa/test.nut
+    with open(os.path.join(ROOT, 'client_script', 'sqrsa', 'test.nut'), 'r') as f:
+        src = f.read()
+    m = re.search(r'PRIVATE_KEY =\s*((?:"[0-9a-f]*"\s*\+?\s*)+);', src)
+    return crypto.RSAPrivateKey.from_der(bytes.fromhex(''.join(re.findall(r'"([0-9a-f]*)"', m.group(1)))))
+
+def main():
+    crypto = load_crypto()
+    key = test_key(crypto)
+    sessions = crypto.Sessions(key)
+    secret = os.urandom(crypto.SECRET_SIZE)
+    ciphertext = key.encrypt(secret)
+    n = 200
+    t = timeit(lambda: sessions.handshake(0, ciphertext), number=n)
+    print('handshake (%d-bit): %.1f us' % (key.n.bit_length(), t / n * 1e6))
+
+    for size in (16, 256, 4096):
+        payload = os.urandom(size)
+        messages = []
+        sessions.handshake(0, ciphertext)
+        client = crypto.Sessions(key)
+        client.handshake(0, ciphertext)
+        for seq in range(100000):
+            messages.append(client._tag(client._sessions[0][0], seq, payload) + payload) # pylint: disable=protected-access
+        it = iter(messages)
+        n = len(messages)
+        t = timeit(lambda: sessions.verify(0, next(it)), number=n)
+        print('verify %5d bytes: %.2f us' % (size, t / n * 1e6))
+        n = 100000
+        t = timeit(lambda: sessions.sign(0, payload), number=n)
+        print('sign   %5d bytes: %.2f us' % (size, t / n * 1e6))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# Replay a log written by vcmp.start_recording through a gamemode package
+# against a stubbed _vcmp, as fast as possible, and report callback timings.
+# Usage: replay.py LOG [PACKAGE] [--top N]
+# The gamemode runs in a scratch directory holding copies of the files in
+# the repository root (settings.yaml, keys), so databases such as stats.db
+# are created there and the live ones are never touched.
+import os
+import shutil
+import sys
+import tempfile
+import types
+from collections import defaultdict, deque
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class _Callbacks:
+    def __getattr__(self, name):
+        return None
+
+class _Functions(types.ModuleType):
+    """Native getters answer from the log, in recorded order; everything else is a no-op."""
+
+    def __init__(self, prefixes):
+        super().__init__('_vcmp.functions')
+        self.results = defaultdict(deque)
+        self.misses = defaultdict(int)
+        self._prefixes = prefixes
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if name.startswith(self._prefixes):
+            queue = self.results[name]
+            def fn(*args):
+                if queue:
+                    return queue.popleft()
+                self.misses[name] += 1
+                return None
+        else:
+            def fn(*args):
+                return 0
+        fn.__name__ = name
+        setattr(self, name, fn)
+        return fn
+
+def main():
+    argv = sys.argv[1:]
+    top = 10
+    if '--top' in argv:
+        i = argv.index('--top')
+        top = int(argv[i + 1])
+        del argv[i:i + 2]
+    if not argv or argv[0] == '-h':
+        print('Usage: replay.py LOG [PACKAGE] [--top N]')
+        return
+    log = os.path.abspath(argv[0])
+    package = argv[1] if len(argv) > 1 else 'pytest'
+    os.environ.pop('VCMP_RECORD', None)
+    sys.path.insert(0, ROOT)
+
+    import importlib.util
+    spec = importlib.util.spec_from_file_location('_vcmp_record', os.path.join(ROOT, 'vcmp', 'record.py'))
+    record = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(record)
+
+    stub = types.ModuleType('_vcmp')
+    stub.functions = _Functions(record.RECORDED_PREFIXES)
+    stub.callbacks = _Callbacks()
+    sys.modules['_vcmp'] = stub
+    sys.modules['_vcmp.functions'] = stub.functions
+
+    events = []
+    for rec, name, value in record.read_log(log):
+        if rec == record.REC_RETURN:
+            stub.functions.results[name].append(value)
+        else:
+            events.append((name, value))
+
+    scratch = tempfile.mkdtemp(prefix='vcmp-replay-')
+    for name in os.listdir(ROOT):
+        path = os.path.join(ROOT, name)
+        if os.path.isfile(path) and not name.endswith(('.db', '.db-journal')):
+            shutil.copy(path, scratch)
+    os.chdir(scratch)
+    try:
+        replay(package, events, stub, top)
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+def replay(package, events, stub, top):
+    t = perf_counter()
+    __import__(package)
+    print('import %s: %.3f ms' % (package, (perf_counter() - t) * 1e3))
+
+    totals = defaultdict(lambda: [0, 0.0, 0.0])
+    slowest = []
+    start = perf_counter()
+    for i, (name, args) in enumerate(events):
+        fn = getattr(stub.callbacks, name)
+        if fn is None:
+            continue
+        t = perf_counter()
+        fn(*args)
+        t = perf_counter() - t
+        total = totals[name]
+        total[0] += 1
+        total[1] += t
+        total[2] = max(total[2], t)
+        slowest.append((t, i, name))
+    elapsed = perf_counter() - start
+
+    print('%d events in %.3f ms' % (len(events), elapsed * 1e3))
+    print('%-32s %8s %10s %10s %10s' % ('callback', 'count', 'total ms', 'mean us', 'max us'))
+    for name, (count, total, worst) in sorted(totals.items(), key=lambda x: -x[1][1]):
+        print('%-32s %8d %10.3f %10.2f %10.2f' % (name, count, total * 1e3, total / count * 1e6, worst * 1e6))
+    print('slowest events:')
+    for t, i, name in sorted(slowest, reverse=True)[:top]:
+        print('  #%-8d %-32s %10.2f us' % (i, name, t * 1e6))
+    unused = sum(len(q) for q in stub.functions.results.values())
+    if stub.functions.misses or unused:
+        print('warning: replay diverged from the log (%d getter misses, %d unused results)' % (sum(stub.functions.misses.values()), unused))
+
+if __name__ == '__main__':
+    main()
@@ -1,46 +1,251 @@
 #!/usr/bin/env python3
 import sys
 import os
-from shutil import copyfile, copytree, rmtree
+import json
+import time
+import hashlib
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from shutil import copyfile
 import os.path
 
+import bundle
+
+SQRSA = ['sqrsa/' + name for name in [
+    'util/imp-compatibility.nut',
+    'util/buffer.nut',
+    'util/blob.nut',
+    'util/crypto.nut',
+    'util/dynamic-blob-array.nut',
+    'encoding/der/der-node-type.nut',
+    'encoding/der/der-node.nut',
+    'encrypt/algo/rsa-algorithm.nut',
+    'vukicevic/crunch/crunch.nut'
+]]
+
+# A list is a library: its modules are concatenated into one unit and the
+# ones no other unit uses are dropped.
 FILES = [
+    SQRSA,
     'main.nut'
 ]
 
-def cat_files(files, out_file):
-    with open(out_file, 'wb') as out:
-        for name in files:
-            with open(name, 'rb') as f:
-                out.write(f.read())
+DIST = 'dist'
+STORE = '../store/script'
+MANIFEST = os.path.join(DIST, '.manifest.json')
+BUNDLE = os.path.join(DIST, '.bundle.nut.gz')
+SQ = os.path.abspath(os.path.normpath('bin/sq'))
+
+def data_hash(data):
+    return hashlib.sha1(data).hexdigest()
+
+def file_hash(name):
+    with open(name, 'rb') as f:
+        return data_hash(f.read())
+
+def read_source(name):
+    with open(name, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def source_files():
+    for unit in FILES:
+        if isinstance(unit, list):
+            yield from unit
+        else:
+            yield unit
+
+def unit_sources(env):
+    roots = [read_source(unit) for unit in FILES if not isinstance(unit, list)]
+    sources = []
+    for unit in FILES:
+        if isinstance(unit, list):
+            modules = bundle.prune([(name, read_source(name)) for name in unit], roots)
+            src = ''.join(src for _, src in modules)
+        else:
+            src = read_source(unit)
+        if env == 'prod':
+            src = bundle.minify(src)
+        sources.append(src.encode('utf-8'))
+    return sources
+
+def load_manifest():
+    try:
+        with open(MANIFEST, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(manifest):
+    with open(MANIFEST, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+def module_output(index):
+    return '_mem%d.nut' % index
 
-def compile_cnut():
-    os.chdir('dist')
+def unit_name(index):
+    unit = FILES[index]
+    return unit[0] if isinstance(unit, list) else unit
+
+def run_sq(args, data, name='!'):
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, name), 'wb') as f:
+            f.write(data)
+        try:
+            proc = subprocess.run([SQ] + args + [name], cwd=tmp, stdout=subprocess.PIPE)
+        except OSError:
+            return -1, b''
+    return proc.returncode, proc.stdout
+
+def compile_cnut(name, data, out):
     # Squirrel includes filename in cnut, so we name that file to '!'
-    ret = os.system(os.path.normpath('../bin/sq -o _mem.nut -c !'))
+    return name, run_sq(['-o', os.path.abspath(out), '-c'], data)[0]
+
+def build_modules(env, manifest):
+    old = manifest.get('modules', {})
+    modules = {}
+    jobs = []
+    for i, data in enumerate(unit_sources(env)):
+        name = unit_name(i)
+        out = os.path.join(DIST, module_output(i))
+        entry = {'hash': data_hash(data), 'env': env, 'out': out}
+        modules[name] = entry
+        if old.get(name) == entry and os.path.exists(out):
+            continue
+        if env == 'prod':
+            jobs.append((name, data, out))
+        else:
+            with open(out, 'wb') as f:
+                f.write(data)
+            print('copied %s' % name)
+    ok = True
+    if jobs:
+        with ProcessPoolExecutor() as pool:
+            for name, ret in pool.map(compile_cnut, *zip(*jobs)):
+                if ret != 0:
+                    print('compile error: %s' % name)
+                    out = modules.pop(name)['out']
+                    # Do not leave the previous (maybe dev) output behind
+                    if os.path.exists(out):
+                        os.remove(out)
+                    ok = False
+                else:
+                    print('compiled %s' % name)
+    manifest['modules'] = modules
+    remove_stale_outputs()
+    return ok
+
+def remove_stale_outputs():
+    # Outputs of units removed from FILES
+    outputs = {module_output(i) for i in range(len(FILES))}
+    for name in os.listdir(DIST):
+        if name.startswith('_mem') and name.endswith('.nut') and name not in outputs:
+            os.remove(os.path.join(DIST, name))
+            print('removed %s' % name)
+
+def write_main():
+    stub = ''.join('dofile("%s");\n' % module_output(i) for i in range(len(FILES)))
+    path = os.path.join(DIST, 'main.nut')
+    try:
+        with open(path, 'r') as f:
+            if f.read() == stub:
+                return
+    except OSError:
+        pass
+    with open(path, 'w') as f:
+        f.write(stub)
+
+def report_size():
+    source = sum(os.path.getsize(name) for name in source_files())
+    data = b''
+    for name in ['main.nut'] + [module_output(i) for i in range(len(FILES))]:
+        with open(os.path.join(DIST, name), 'rb') as f:
+            data += f.read()
+    packed = bundle.compress(data, BUNDLE)
+    print('source %d bytes, bundle %d bytes, gzip %d bytes' % (source, len(data), packed))
+
+def sync_dir(src, dst, manifest):
+    old = manifest.get('store', {})
+    store = {}
+    os.makedirs(dst, exist_ok=True)
+    for name in os.listdir(src):
+        if name.startswith('.'):
+            continue
+        h = file_hash(os.path.join(src, name))
+        store[name] = h
+        target = os.path.join(dst, name)
+        if old.get(name) != h or not os.path.exists(target):
+            copyfile(os.path.join(src, name), target)
+    for name in old:
+        if name not in store and os.path.exists(os.path.join(dst, name)):
+            os.remove(os.path.join(dst, name))
+    manifest['store'] = store
+
+def build(env):
+    os.makedirs(DIST, exist_ok=True)
+    manifest = load_manifest()
+    ok = build_modules(env, manifest)
+    write_main()
+    if ok:
+        report_size()
+        sync_dir(DIST, STORE, manifest)
+    else:
+        print('build failed, %s not updated' % STORE)
+    save_manifest(manifest)
+    return ok
+
+def check_bundle(name, sources):
+    # Bundle sqrsa as prod would for the sources, then compile and run it;
+    # the test prints true.
+    library = [(lib, read_source(lib)) for lib in SQRSA]
+    modules = bundle.prune(library, sources)
+    pruned = ''.join(src for _, src in modules)
+    data = bundle.minify(pruned + ''.join(sources)).encode('utf-8')
+    print('check %s: kept %d of %d sqrsa modules, %d -> %d bytes, minified bundle %d bytes' % (
+        name, len(modules), len(library), sum(len(src) for _, src in library), len(pruned), len(data)))
+    if not os.path.exists(SQ):
+        print('check %s: %s not found, bundle not compiled or run' % (name, SQ))
+        return False
+    ret = run_sq(['-o', 'out.cnut', '-c'], data)[0]
     if ret != 0:
-        print("compile error")
-    os.remove('!')
-    os.chdir('..')
+        print('check %s: bundle does not compile' % name)
+        return False
+    ret, out = run_sq([], data, 'test.nut')
+    if ret != 0 or out.strip() != b'true':
+        print('check %s: failed' % name)
+        return False
+    print('check %s: ok' % name)
+    return True
+
+def check():
+    ok = check_bundle('sqrsa/test.nut', [read_source('sqrsa/test.nut')])
+    # session.nut joins FILES once this passes
+    return check_bundle('session_test.nut', [read_source('session.nut'), read_source('session_test.nut')]) and ok
 
-def copypath(src, dst):
-    if os.path.exists(dst):
-        rmtree(dst)
-    copytree(src, dst)
+def watch(env, interval=0.5):
+    mtimes = {}
+    while True:
+        current = {name: os.stat(name).st_mtime for name in source_files() if os.path.exists(name)}
+        if current != mtimes:
+            mtimes = current
+            build(env)
+        time.sleep(interval)
 
 def main():
-    argv = sys.argv.copy()
-    if len(argv) < 2:
-        argv.append('dev')
-    if argv[1] == '-h':
-        print('Usage: build.py [dev/prod]')
+    argv = sys.argv[1:]
+    if '-h' in argv:
+        print('Usage: build.py [dev/prod/check] [--watch]')
         return
-    env = argv[1]
-    cat_files(FILES, 'dist/!' if env == 'prod' else 'dist/_mem.nut')
-    if env == 'prod':
-        compile_cnut()
-    copyfile('main_stub.nut', 'dist/main.nut')
-    copypath('dist', '../store/script')
+    if 'check' in argv:
+        sys.exit(0 if check() else 1)
+    env = 'prod' if 'prod' in argv else 'dev'
+    if '--watch' in argv:
+        try:
+            watch(env)
+        except KeyboardInterrupt:
+            pass
+    elif not build(env):
+        sys.exit(1)
 
 if __name__ == '__main__':
     main()
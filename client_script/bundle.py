@@ -0,0 +1,113 @@
+import re
+import gzip
+
+_token_re = re.compile(r'''
+    (?P<ws>[ \t\r\f\v]+)
+  | (?P<nl>\n)
+  | (?P<comment>//[^\n]*|\#[^\n]*|/\*.*?\*/)
+  | (?P<string>@"(?:[^"]|"")*"|"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')
+  | (?P<number>0[xX][0-9a-fA-F]+|\d+(?:\.\d*)?(?:[eE][+-]?\d+)?)
+  | (?P<ident>[A-Za-z_]\w*)
+  | (?P<op><-|::|\+\+|--|<<=|>>=|>>>|<=>|[-+*/%&|^<>=!]=|&&|\|\||<<|>>|\.\.\.|.)
+''', re.S | re.X)
+
+_OPS = set('+-*/%<>=!&|^~?:.@')
+
+# A newline after one of these tokens can never end a statement
+_CONTINUE = {'{', '(', '[', ';', ',', '=', '<-', '::', '.', '+', '-', '*', '/', '%',
+             '<', '>', '<=', '>=', '==', '!=', '&&', '||', '!', '?', ':', '&', '|', '^',
+             '~', '<<', '>>', '>>>', '+=', '-=', '*=', '/=', '%=', '<=>'}
+# A newline before one of these tokens is never needed
+_CLOSE = {'}', ')', ']'}
+
+def tokenize(src):
+    """Yield (kind, text) for a Squirrel source, comments and whitespace included."""
+    pos = 0
+    length = len(src)
+    while pos < length:
+        m = _token_re.match(src, pos)
+        yield m.lastgroup, m.group()
+        pos = m.end()
+
+def _need_space(prev, tok, prev_kind):
+    a = prev[-1]
+    b = tok[0]
+    if (a.isalnum() or a == '_') and (b.isalnum() or b == '_'):
+        return True
+    if a in _OPS and b in _OPS:
+        return True
+    return prev_kind == 'number' and b == '.'
+
+def minify(src):
+    """Strip comments and whitespace, keeping the newlines that end statements."""
+    out = []
+    prev = prev_kind = None
+    newline = False
+    for kind, tok in tokenize(src):
+        if kind == 'ws':
+            continue
+        if kind == 'comment':
+            newline = newline or '\n' in tok
+            continue
+        if kind == 'nl':
+            newline = True
+            continue
+        if prev is not None:
+            if newline and prev not in _CONTINUE and tok not in _CLOSE:
+                out.append('\n')
+            elif _need_space(prev, tok, prev_kind):
+                out.append(' ')
+        out.append(tok)
+        prev, prev_kind = tok, kind
+        newline = False
+    return ''.join(out) + '\n'
+
+def symbols(src):
+    """Return (defined, referenced) global names of a module."""
+    defined = set()
+    referenced = set()
+    prev = prev2 = prev_kind = None
+    depth = 0
+    for kind, tok in tokenize(src):
+        if kind in ('ws', 'nl', 'comment'):
+            continue
+        if kind == 'ident':
+            if prev in ('class', 'enum', 'const') or prev == 'function' and depth == 0:
+                defined.add(tok)
+            elif prev != '.':
+                referenced.add(tok)
+        elif tok == '<-' and prev_kind == 'ident' and prev2 != '.':
+            defined.add(prev)
+        elif tok == '{':
+            depth += 1
+        elif tok == '}':
+            depth -= 1
+        prev2, prev, prev_kind = prev, tok, kind
+    return defined, referenced - defined
+
+def prune(modules, roots):
+    """Keep the library modules reachable from the root sources, in order.
+
+    modules is a list of (name, source), roots a list of sources using them.
+    """
+    info = [(name, src) + symbols(src) for name, src in modules]
+    wanted = set()
+    for src in roots:
+        wanted |= symbols(src)[1]
+    keep = set()
+    changed = True
+    while changed:
+        changed = False
+        for name, _, defined, referenced in info:
+            if name not in keep and defined & wanted:
+                keep.add(name)
+                wanted |= referenced
+                changed = True
+    return [(name, src) for name, src, _, _ in info if name in keep]
+
+def compress(data, path):
+    """Write a gzip copy of the bundle and return its size."""
+    packed = gzip.compress(data, 9)
+    with open(path, 'wb') as f:
+        f.write(packed)
+    return len(packed)
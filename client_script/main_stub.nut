@@ -1 +0,0 @@
-dofile("_mem.nut")
\ No newline at end of file
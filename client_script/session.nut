@@ -0,0 +1,200 @@
+// Client side of vcmp.crypto.Sessions.
+// handshake() returns the RSA-encrypted secret to send after the
+// MSG_HANDSHAKE byte; then sign() every outgoing payload and verify() every
+// incoming one. Payloads and messages are Squirrel blobs.
+// The server public key is not sent by the server (that would let anyone
+// on the path swap it): embed the hex of
+// RSAPrivateKey.load(<client_script_key>).public_der() in the client
+// script and wrap it in a Blob, the way sqrsa/test.nut does.
+// Not part of FILES yet: run build.py check (session_test.nut) first.
+// Integers are kept in their low 32 bits, so this works with both 32 and
+// 64 bit Squirrel builds.
+
+const SESSION_MAC_SIZE = 8;
+const SESSION_SECRET_SIZE = 32;
+
+local SHA256_K = [
+  0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+  0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+  0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+  0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+  0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+  0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+  0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+  0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2
+];
+
+function sha256_rotr(x, n)
+{
+  return ((x >>> n) | (x << (32 - n))) & 0xffffffff;
+}
+
+// SHA-256 of a blob (shorter than 256 MiB), as a 32 byte blob.
+function sha256(data)
+{
+  local len = data.len();
+  local bits = len * 8;
+  local size = ((len + 8) / 64 + 1) * 64;
+  local p = blob(size);
+  for (local i = 0; i < len; ++i)
+    p[i] = data[i];
+  p[len] = 0x80;
+  p[size - 4] = (bits >>> 24) & 0xff;
+  p[size - 3] = (bits >>> 16) & 0xff;
+  p[size - 2] = (bits >>> 8) & 0xff;
+  p[size - 1] = bits & 0xff;
+
+  local h = [0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19];
+  for (local i = 0; i < 8; ++i)
+    h[i] = h[i] & 0xffffffff;
+  local w = array(64, 0);
+  for (local o = 0; o < size; o += 64) {
+    for (local t = 0; t < 16; ++t) {
+      local j = o + t * 4;
+      w[t] = ((p[j] << 24) | (p[j + 1] << 16) | (p[j + 2] << 8) | p[j + 3]) & 0xffffffff;
+    }
+    for (local t = 16; t < 64; ++t) {
+      local x = w[t - 15];
+      local y = w[t - 2];
+      local s0 = sha256_rotr(x, 7) ^ sha256_rotr(x, 18) ^ (x >>> 3);
+      local s1 = sha256_rotr(y, 17) ^ sha256_rotr(y, 19) ^ (y >>> 10);
+      w[t] = (w[t - 16] + s0 + w[t - 7] + s1) & 0xffffffff;
+    }
+    local a = h[0], b = h[1], c = h[2], d = h[3], e = h[4], f = h[5], g = h[6], k = h[7];
+    for (local t = 0; t < 64; ++t) {
+      local s1 = sha256_rotr(e, 6) ^ sha256_rotr(e, 11) ^ sha256_rotr(e, 25);
+      local ch = (e & f) ^ (~e & g);
+      local t1 = (k + s1 + ch + (SHA256_K[t] & 0xffffffff) + w[t]) & 0xffffffff;
+      local s0 = sha256_rotr(a, 2) ^ sha256_rotr(a, 13) ^ sha256_rotr(a, 22);
+      local maj = (a & b) ^ (a & c) ^ (b & c);
+      k = g;
+      g = f;
+      f = e;
+      e = (d + t1) & 0xffffffff;
+      d = c;
+      c = b;
+      b = a;
+      a = (t1 + s0 + maj) & 0xffffffff;
+    }
+    h[0] = (h[0] + a) & 0xffffffff;
+    h[1] = (h[1] + b) & 0xffffffff;
+    h[2] = (h[2] + c) & 0xffffffff;
+    h[3] = (h[3] + d) & 0xffffffff;
+    h[4] = (h[4] + e) & 0xffffffff;
+    h[5] = (h[5] + f) & 0xffffffff;
+    h[6] = (h[6] + g) & 0xffffffff;
+    h[7] = (h[7] + k) & 0xffffffff;
+  }
+
+  local digest = blob(32);
+  for (local i = 0; i < 8; ++i) {
+    digest[i * 4] = (h[i] >>> 24) & 0xff;
+    digest[i * 4 + 1] = (h[i] >>> 16) & 0xff;
+    digest[i * 4 + 2] = (h[i] >>> 8) & 0xff;
+    digest[i * 4 + 3] = h[i] & 0xff;
+  }
+  return digest;
+}
+
+function hmac_sha256(key, data)
+{
+  if (key.len() > 64)
+    key = sha256(key);
+  local inner = blob(64 + data.len());
+  local outer = blob(64 + 32);
+  for (local i = 0; i < 64; ++i) {
+    local x = i < key.len() ? key[i] : 0;
+    inner[i] = x ^ 0x36;
+    outer[i] = x ^ 0x5c;
+  }
+  for (local i = 0; i < data.len(); ++i)
+    inner[64 + i] = data[i];
+  local digest = sha256(inner);
+  for (local i = 0; i < 32; ++i)
+    outer[64 + i] = digest[i];
+  return sha256(outer);
+}
+
+// math.rand() is the C rand(): unseeded it repeats on every client, and its
+// state is small. Seed it from clock jitter and hash its output together
+// with the jitter, which is the best entropy the client script has.
+function session_secret()
+{
+  local pool = blob();
+  pool.writen("time" in getroottable() ? ::time() : 0, 'i');
+  local digest = null;
+  for (local i = 0; i < 16; ++i) {
+    pool.writen(::clock(), 'f');
+    digest = sha256(pool); // some work between clock reads
+  }
+  ::srand(((digest[0] << 24) | (digest[1] << 16) | (digest[2] << 8) | digest[3]) & 0x7fffffff);
+  local bytes = Buffer(SESSION_SECRET_SIZE);
+  Crypto.generateRandomBytes(bytes);
+  for (local i = 0; i < SESSION_SECRET_SIZE; ++i)
+    pool.writen(bytes.get(i), 'b');
+  pool.writen(::clock(), 'f');
+  return sha256(pool);
+}
+
+class ScriptSession {
+  key_ = null;
+  sendSeq_ = 0;
+  recvSeq_ = 0;
+
+  // publicKey: the server's SubjectPublicKeyInfo DER as a sqrsa Blob.
+  function handshake(publicKey)
+  {
+    local secret = session_secret();
+    local label = "vcmp-session";
+    local data = blob(label.len());
+    for (local i = 0; i < label.len(); ++i)
+      data[i] = label[i];
+    key_ = hmac_sha256(secret, data);
+    sendSeq_ = 0;
+    recvSeq_ = 0;
+    return RsaAlgorithm.encrypt(publicKey, Blob(Buffer.from(secret), false)).buf().toBlob();
+  }
+
+  function tag_(seq, payload)
+  {
+    local data = blob(4 + payload.len());
+    data[0] = seq & 0xff;
+    data[1] = (seq >>> 8) & 0xff;
+    data[2] = (seq >>> 16) & 0xff;
+    data[3] = (seq >>> 24) & 0xff;
+    for (local i = 0; i < payload.len(); ++i)
+      data[4 + i] = payload[i];
+    return hmac_sha256(key_, data);
+  }
+
+  function sign(payload)
+  {
+    local tag = tag_(sendSeq_, payload);
+    ++sendSeq_;
+    local message = blob(SESSION_MAC_SIZE + payload.len());
+    for (local i = 0; i < SESSION_MAC_SIZE; ++i)
+      message[i] = tag[i];
+    for (local i = 0; i < payload.len(); ++i)
+      message[SESSION_MAC_SIZE + i] = payload[i];
+    return message;
+  }
+
+  // Returns the payload of an authentic server message, otherwise null.
+  function verify(message)
+  {
+    if (key_ == null || message.len() < SESSION_MAC_SIZE)
+      return null;
+    local payload = blob(message.len() - SESSION_MAC_SIZE);
+    for (local i = 0; i < payload.len(); ++i)
+      payload[i] = message[SESSION_MAC_SIZE + i];
+    // Server messages have the top bit of the sequence number set
+    local tag = tag_(recvSeq_ | 0x80000000, payload);
+    local diff = 0;
+    for (local i = 0; i < SESSION_MAC_SIZE; ++i)
+      diff = diff | (tag[i] ^ message[i]);
+    if (diff != 0)
+      return null;
+    ++recvSeq_;
+    return payload;
+  }
+}
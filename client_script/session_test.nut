@@ -0,0 +1,34 @@
+// Known answers for session.nut (FIPS 180-2 and RFC 4231 test case 2),
+// then a sign/verify round trip.
+
+function session_test_blob(s)
+{
+  local b = blob(s.len());
+  for (local i = 0; i < s.len(); ++i)
+    b[i] = s[i];
+  return b;
+}
+
+function session_test_hex(b)
+{
+  local s = "";
+  for (local i = 0; i < b.len(); ++i)
+    s += format("%02x", b[i]);
+  return s;
+}
+
+local ok = session_test_hex(sha256(session_test_blob("abc"))) ==
+  "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad";
+ok = ok && session_test_hex(sha256(blob(0))) ==
+  "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855";
+ok = ok && session_test_hex(hmac_sha256(session_test_blob("Jefe"), session_test_blob("what do ya want for nothing?"))) ==
+  "5bdcc146bf60754e6a042426089575c75a003f089d2739839dec58b964ec3843";
+
+local a = ScriptSession();
+a.key_ = session_secret();
+local signed = a.sign(session_test_blob("hello"));
+ok = ok && signed.len() == SESSION_MAC_SIZE + 5;
+// verify() expects the server's sequence numbers, so a client message must fail
+ok = ok && a.verify(signed) == null;
+
+print(ok);
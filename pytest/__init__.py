@@ -1 +1,10 @@
-from . import events
+import os
+import vcmp
+from vcmp.loader import Loader
+
+# Before any callback, so the log starts with on_server_initialise
+if os.environ.get('VCMP_RECORD'):
+    vcmp.start_recording(os.environ['VCMP_RECORD'])
+
+loader = Loader(__name__)
+loader.load_manifest(os.path.join(os.path.dirname(__file__), 'manifest.json'))
@@ -0,0 +1,20 @@
+import vcmp
+from vcmp.animation import Animator
+from vcmp.enum import EntityPool
+
+animator = Animator()
+
+def load_animation(a, objects):
+    for i in a:
+        object_index, loop, keyframes = i[0], i[1], i[2]
+        if animator.play(objects[object_index], [tuple(k) for k in keyframes], loop) < 0:
+            print('animation: object %d not animated (empty track or animator full)' % object_index)
+
+@vcmp.callback
+def on_server_frame(elapsed_time):
+    animator.on_frame()
+
+@vcmp.callback
+def on_entity_pool_change(pool, entity_id, is_deleted):
+    if pool == EntityPool.Object and is_deleted:
+        animator.stop(entity_id)
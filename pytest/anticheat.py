@@ -0,0 +1,34 @@
+import vcmp
+from vcmp.anticheat import AntiCheat
+from . import loader
+
+def report_cheat(player_id, kind, value):
+    ban = loader.load('ban')
+    if ban is not None:
+        ban.report_cheat(player_id, kind, value)
+
+anticheat = AntiCheat(report_cheat)
+
+@vcmp.callback
+def on_player_update(player_id, update_type):
+    anticheat.on_player_update(player_id)
+
+@vcmp.callback
+def on_vehicle_update(vehicle_id, update_type):
+    anticheat.on_vehicle_update(vehicle_id)
+
+@vcmp.callback
+def on_vehicle_respawn(vehicle_id):
+    anticheat.on_vehicle_respawn(vehicle_id)
+
+@vcmp.callback
+def on_player_spawn(player_id):
+    anticheat.reset(player_id)
+
+@vcmp.callback
+def on_player_disconnect(player_id, reason):
+    anticheat.reset(player_id)
+
+@vcmp.callback
+def on_server_frame(elapsed_time):
+    anticheat.on_frame()
@@ -1,5 +1,8 @@
 import re
+import vcmp
+from time import monotonic
 from _vcmp import functions as func
+from vcmp.admission import Admission
 
 TYPE_UID = 0
 TYPE_UID2 = 1
@@ -7,7 +10,12 @@ TYPE_FULLSTR = 3
 TYPE_SUBSTR = 4
 TYPE_REGEX = 5
 
+CHEAT_STRIKES = 3
+STRIKE_EXPIRY = 600.0 # seconds
+
 ban_list = []
+admission = Admission()
+strikes = {}
 
 def load_ban_list(l):
     global ban_list
@@ -24,11 +32,27 @@ def load_ban_list(l):
                     ban_list.append((i, TYPE_FULLSTR))
                 elif isinstance(i, list):
                     ban_list.append((i[0], i[1] + TYPE_FULLSTR))
+        elif k == 'ip':
+            for i in v:
+                admission.ban_ip(i)
+    admission.clear_cache()
+
+def check_ban_name(name):
+    for n, t in ban_list:
+        if t == TYPE_FULLSTR:
+            if name == n:
+                return True
+        elif t == TYPE_SUBSTR:
+            if name.find(n) != -1:
+                return True
+        elif t == TYPE_REGEX:
+            if re.search(n, name):
+                return True
+    return False
 
 def check_ban_list(player_id):
     uid = func.get_player_uid(player_id)
     uid2 = func.get_player_uid2(player_id)
-    name = func.get_player_name(player_id)
     for n, t in ban_list:
         if t == TYPE_UID:
             if uid == n:
@@ -36,12 +60,35 @@ def check_ban_list(player_id):
         elif t == TYPE_UID2:
             if uid2 == n:
                 return True
-        elif t == TYPE_FULLSTR:
-            if name == n:
-                return True
-        elif t == TYPE_SUBSTR:
-            if name.find(n) != -1:
-                return True
-        elif t == TYPE_REGEX:
-            if not re.search(n, name):
-                return True
+    return check_ban_name(func.get_player_name(player_id))
+
+admission.name_checks.append(check_ban_name)
+
+@vcmp.callback
+def on_incoming_connection(name, name_size, password, ip):
+    return admission.check(name, name_size, password, ip)
+
+def report_cheat(player_id, kind, value):
+    print('anticheat: player %d %s %.2f' % (player_id, kind, value))
+    now = monotonic()
+    recent = [t for t in strikes.get(player_id, ()) if now - t < STRIKE_EXPIRY]
+    recent.append(now)
+    strikes[player_id] = recent
+    if len(recent) >= CHEAT_STRIKES:
+        uid = func.get_player_uid(player_id)
+        if uid:
+            ban_list.append((uid, TYPE_UID))
+        uid2 = func.get_player_uid2(player_id)
+        if uid2:
+            ban_list.append((uid2, TYPE_UID2))
+        func.kick_player(player_id)
+
+@vcmp.callback
+def on_player_connect(player_id):
+    # UIDs are not known in on_incoming_connection
+    if check_ban_list(player_id):
+        func.kick_player(player_id)
+
+@vcmp.callback
+def on_player_disconnect(player_id, reason):
+    strikes.pop(player_id, None)
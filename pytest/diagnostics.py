@@ -0,0 +1,36 @@
+import os
+import sys
+import vcmp
+from vcmp.diagnostics import LeakDetector, MemoryMonitor
+
+leaks = LeakDetector()
+memory = MemoryMonitor(float(os.environ.get('VCMP_TRACEMALLOC') or 300.0))
+
+if os.environ.get('VCMP_TRACEMALLOC'):
+    memory.start()
+
+def _watch(module, get):
+    # Only look at modules the loader has imported
+    def held(player_id):
+        mod = sys.modules.get(module)
+        return mod is not None and LeakDetector.holds(get(mod), player_id)
+    leaks.watch(module, held)
+
+_watch('pytest.player', lambda m: m.players)
+_watch('pytest.ban', lambda m: m.strikes)
+_watch('pytest.leaderboard', lambda m: m.player_keys)
+_watch('pytest.events', lambda m: lambda player_id: player_id in m.sampler.ids)
+_watch('pytest.script', lambda m: lambda player_id: m.sessions is not None and m.sessions.has_session(player_id))
+
+@vcmp.callback
+def on_server_frame(elapsed_time):
+    leaks.on_frame(elapsed_time)
+    memory.on_frame(elapsed_time)
+
+@vcmp.callback
+def on_player_connect(player_id):
+    leaks.on_connect(player_id)
+
+@vcmp.callback
+def on_player_disconnect(player_id, reason):
+    leaks.on_disconnect(player_id)
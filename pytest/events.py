@@ -1,11 +1,30 @@
 import vcmp
 from _vcmp import functions as func
+from vcmp.sampler import FrameSampler
 from .settings import load_settings
 
+sampler = FrameSampler(interval=0.1)
+
 @vcmp.callback
 def on_server_initialise():
     load_settings()
 
+@vcmp.callback
+def on_server_shutdown():
+    vcmp.stop_recording()
+
+@vcmp.callback
+def on_server_frame(elapsed_time):
+    sampler.on_frame(elapsed_time)
+
+@vcmp.callback
+def on_player_connect(player_id):
+    sampler.connect(player_id)
+
+@vcmp.callback
+def on_player_disconnect(player_id, reason):
+    sampler.disconnect(player_id)
+
 @vcmp.callback
 def on_player_command(player_id, cmd):
     if cmd == 'pos':
@@ -0,0 +1,32 @@
+import vcmp
+from vcmp.enum import EntityPool
+from vcmp.handling import HandlingManager, make_preset
+
+handling = HandlingManager()
+base = {}
+presets = {}
+
+def load_base(vehicle_handling=(), weapon_data_value=()):
+    preset = make_preset(vehicle_handling, weapon_data_value)
+    base.update(preset)
+    handling.update(preset)
+
+def load_presets(p):
+    for name, v in p.items():
+        presets[name] = make_preset(v.get('vehicle_handling') or (), v.get('weapon_data_value') or ())
+
+def apply_preset(name=None, now=False):
+    """Switch to base settings plus the named preset, over the next frames."""
+    target = dict(base)
+    if name is not None:
+        target.update(presets[name])
+    return handling.apply(target, now)
+
+@vcmp.callback
+def on_server_frame(elapsed_time):
+    handling.on_frame()
+
+@vcmp.callback
+def on_entity_pool_change(pool, entity_id, is_deleted):
+    if pool == EntityPool.Vehicle and is_deleted:
+        handling.forget_vehicle(entity_id)
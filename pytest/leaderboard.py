@@ -0,0 +1,47 @@
+import vcmp
+import vcmp.player
+from _vcmp import functions as func
+from vcmp.rank import Leaderboard, OfflineStats
+from vcmp.utils import MAX_PLAYERS, RGBA
+
+scores = Leaderboard(OfflineStats('stats.db'))
+player_keys = [None] * MAX_PLAYERS
+
+def _on_score(player_id, value, relative):
+    key = player_keys[player_id]
+    if key is None:
+        return
+    if relative:
+        scores.add(key, value)
+    else:
+        scores.update(key, value)
+
+vcmp.player.score_listeners.append(_on_score)
+
+@vcmp.callback
+def on_player_connect(player_id):
+    key = func.get_player_uid(player_id)
+    player_keys[player_id] = key
+    if key is None: # players without a UID would all share one entry
+        return
+    scores.connect(key)
+    func.set_player_score(player_id, int(scores.online.value(key)))
+
+@vcmp.callback
+def on_player_disconnect(player_id, reason):
+    key = player_keys[player_id]
+    if key is not None:
+        scores.disconnect(key)
+        player_keys[player_id] = None
+
+@vcmp.callback
+def on_player_command(player_id, cmd):
+    cmd = cmd.split(' ', 1)[0]
+    colour = RGBA(255, 255, 255, 255)
+    if cmd == 'top':
+        for i, (key, value) in enumerate(scores.top(5)):
+            func.send_client_message(player_id, colour, '%d. %s %d' % (i + 1, key, value))
+    elif cmd == 'rank':
+        key = player_keys[player_id]
+        if key is not None:
+            func.send_client_message(player_id, colour, 'Rank %d' % (scores.rank(key) + 1))
@@ -0,0 +1,22 @@
+import os
+import vcmp
+
+try:
+    from vcmp.offload import Offload
+except ImportError: # multiprocessing.shared_memory needs Python 3.8
+    Offload = None
+
+# Workers need a real python interpreter, not the server executable;
+# without one there is nothing to spawn them with
+_executable = os.environ.get('VCMP_PYTHON')
+offload = Offload(executable=_executable) if Offload is not None and _executable else None
+
+@vcmp.callback
+def on_server_frame(elapsed_time):
+    if offload is not None:
+        offload.poll()
+
+@vcmp.callback
+def on_server_shutdown():
+    if offload is not None:
+        offload.shutdown()
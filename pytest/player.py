@@ -1,7 +1,10 @@
+import vcmp
 from vcmp.player import Player
 from vcmp.utils import MAX_PLAYERS
 from typing import List
 
+from . import loader
+
 players = [None] * MAX_PLAYERS
 
 class _MyPlayer(Player):
@@ -12,4 +15,11 @@ def MyPlayer(player_id) -> _MyPlayer:
     global players
     if not players[player_id]:
         players[player_id] = _MyPlayer(player_id)
+        diagnostics = loader.load('diagnostics')
+        if diagnostics is not None:
+            diagnostics.leaks.track(players[player_id], player_id)
     return players[player_id]
+
+@vcmp.callback
+def on_player_disconnect(player_id, reason):
+    players[player_id] = None
@@ -0,0 +1,40 @@
+import vcmp
+from _vcmp import functions as func
+from vcmp.crypto import RSAPrivateKey, Sessions
+
+MSG_HANDSHAKE = 0
+MSG_DATA = 1
+
+sessions = None
+script_handlers = []
+
+def load_script_key(path):
+    global sessions
+    sessions = Sessions(RSAPrivateKey.load(path))
+
+def send_script_data(player_id, payload):
+    data = sessions.sign(player_id, payload)
+    if data is not None:
+        func.send_client_script_data(player_id, bytes([MSG_DATA]) + data)
+
+@vcmp.callback
+def on_client_script_data(player_id, data):
+    if sessions is None or not data:
+        return
+    if data[0] == MSG_HANDSHAKE:
+        # One RSA exchange per connection: a repeat would cost another
+        # private key operation and reset the sequence numbers
+        if sessions.has_session(player_id) or not sessions.handshake(player_id, data[1:]):
+            func.kick_player(player_id)
+    elif data[0] == MSG_DATA:
+        payload = sessions.verify(player_id, data[1:])
+        if payload is None:
+            func.kick_player(player_id)
+            return
+        for fn in script_handlers:
+            fn(player_id, payload)
+
+@vcmp.callback
+def on_player_disconnect(player_id, reason):
+    if sessions is not None:
+        sessions.drop(player_id)
@@ -4,8 +4,13 @@ from math import floor
 from _vcmp import functions as func
 from vcmp.enum import ServerOption
 
-from .ban import load_ban_list
-from .teleport import load_teleport
+from . import loader
+
+def _call(module, name, *args, **kwargs):
+    # A module that failed to import was reported by the loader; skip its section
+    mod = loader.load(module)
+    if mod is not None:
+        getattr(mod, name)(*args, **kwargs)
 
 def _load_server_settings(s):
     for k, v in s.items():
@@ -65,6 +70,7 @@ def _load_hide_map_object(h):
             func.hide_map_object(*o)
 
 def load_settings():
+    objects = []
     with open('settings.yaml', 'r') as f:
         for k, v in yaml.load(f, Loader=yaml.Loader).items():
             if not v:
@@ -76,8 +82,7 @@ def load_settings():
             elif k == 'hide_map_object':
                 _load_hide_map_object(v)
             elif k == 'weapon_data_value':
-                for i in v:
-                    func.set_weapon_data_value(*i)
+                _call('handling', 'load_base', weapon_data_value=v)
             elif k == 'coord_blip':
                 for i in v:
                     func.create_coord_blip(*i)
@@ -96,15 +101,20 @@ def load_settings():
                     elif i == 'camera_look_at':
                         func.set_spawn_camera_look_at(*j)
             elif k == 'ban':
-                load_ban_list(v)
+                _call('ban', 'load_ban_list', v)
             elif k == 'vehicle':
                 for i in v:
                     func.create_vehicle(*i)
             elif k == 'vehicle_handling':
-                for i in v:
-                    func.set_handling_rule(*i)
+                _call('handling', 'load_base', vehicle_handling=v)
+            elif k == 'handling_presets':
+                _call('handling', 'load_presets', v)
             elif k == 'object':
                 for i in v:
-                    func.create_object(*i)
+                    objects.append(func.create_object(*i))
+            elif k == 'object_animation':
+                _call('animation', 'load_animation', v, objects)
             elif k == 'teleport':
-                load_teleport(v)
+                _call('teleport', 'load_teleport', v)
+            elif k == 'client_script_key':
+                _call('script', 'load_script_key', v)
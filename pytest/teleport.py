@@ -1,31 +1,71 @@
 import vcmp
 from _vcmp import functions as func
+from vcmp.enum import EntityPool
+from vcmp.trigger import PLAYER, VEHICLE, Action, Triggers
+from . import loader
 
-teleports = {}
+triggers = Triggers()
+
+def teleport_action(to, move_vehicle):
+    anticheat = loader.load('anticheat')
+    notify = [(PLAYER, anticheat.anticheat.teleported)] if anticheat is not None else []
+    on_foot = notify + [(PLAYER, func.set_player_position, to)]
+    in_vehicle = list(notify)
+    if move_vehicle:
+        # FIXME bikes only
+        x, y, z = to
+        if anticheat is not None:
+            in_vehicle.append((VEHICLE, anticheat.anticheat.vehicle_teleported))
+        in_vehicle += [
+            (VEHICLE, func.set_vehicle_speed, (0.0, 0.0, 0.0, False, False)),
+            (VEHICLE, func.set_vehicle_rotation, (0.0, 0.0, 1.0, 0.0)),
+            (VEHICLE, func.set_vehicle_position, (x, y, z - 0.5, False)),
+            (VEHICLE, func.set_vehicle_speed, (0.0, 0.0, 0.0, False, False)),
+            (VEHICLE, func.set_vehicle_rotation, (0.0, 0.0, 1.0, 0.0)),
+        ]
+    return Action(on_foot, in_vehicle)
 
 def load_teleport(t):
-    global teleports
     for i in t:
         pos = i[0]
         to = i[1]
-        options = {'radius': 2.0, 'move_vehicle': False, 'is_sphere': True}
+        options = {'radius': 2.0, 'move_vehicle': False, 'is_sphere': True, 'pickup': None}
         if len(i) >= 3:
             options.update(i[2])
-        check_point_id = func.create_check_point(-1, 0, options['is_sphere'], *pos, 252, 138, 242, 255, options['radius'])
-        teleports[check_point_id] = (to, options['move_vehicle'])
+        action = teleport_action(to, options['move_vehicle'])
+        # A failed create returns an invalid id, which Triggers rejects;
+        # skip that teleport instead of the rest of the settings
+        try:
+            if options['pickup'] is not None:
+                pickup_id = func.create_pickup(options['pickup'], 0, 1, *pos, 255, True)
+                triggers.set_pickup(pickup_id, action)
+            else:
+                check_point_id = func.create_check_point(-1, 0, options['is_sphere'], *pos, 252, 138, 242, 255, options['radius'])
+                triggers.set_check_point(check_point_id, action)
+        except ValueError as e:
+            print('teleport: skipped %r: %s' % (pos, e))
 
 @vcmp.callback
 def on_checkpoint_entered(check_point_id, player_id):
-    if check_point_id in teleports:
-        to, move_vehicle = teleports[check_point_id]
-        vehicle_id = func.get_player_vehicle_id(player_id)
-        if vehicle_id == 0:
-            func.set_player_position(player_id, *to)
-        elif move_vehicle:
-            # FIXME bikes only
-            x, y, z = to
-            func.set_vehicle_speed(vehicle_id, 0.0, 0.0, 0.0, False, False)
-            func.set_vehicle_rotation(vehicle_id, 0.0, 0.0, 1.0, 0.0)
-            func.set_vehicle_position(vehicle_id, x, y, z - 0.5, False)
-            func.set_vehicle_speed(vehicle_id, 0.0, 0.0, 0.0, False, False)
-            func.set_vehicle_rotation(vehicle_id, 0.0, 0.0, 1.0, 0.0)
+    triggers.check_point_entered(check_point_id, player_id)
+
+@vcmp.callback
+def on_checkpoint_exited(check_point_id, player_id):
+    triggers.check_point_exited(check_point_id, player_id)
+
+@vcmp.callback
+def on_pickup_pick_attempt(pickup_id, player_id):
+    return triggers.pickup_pick_attempt(pickup_id, player_id)
+
+@vcmp.callback
+def on_pickup_picked(pickup_id, player_id):
+    triggers.pickup_picked(pickup_id, player_id)
+
+@vcmp.callback
+def on_entity_pool_change(pool, entity_id, is_deleted):
+    if not is_deleted:
+        return
+    if pool == EntityPool.CheckPoint:
+        triggers.remove_check_point(entity_id)
+    elif pool == EntityPool.Pickup:
+        triggers.remove_pickup(entity_id)
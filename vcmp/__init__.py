@@ -1,20 +1,77 @@
-import _vcmp
+try:
+    import _vcmp
+except ImportError: # vcmp.offload worker processes run without the server
+    _vcmp = None
 
 callbacks = {}
 
+_recorder = None
+_recorded_functions = {}
+
+_depth = {} # callback name -> nesting depth of its dispatch
+_removed = set() # callback names with handlers to compact away
+
+def _unregistered(*args, **kwargs): # pylint: disable=unused-argument
+    pass
+
 def callback(func):
     fname = func.__name__
     if not getattr(_vcmp.callbacks, fname):
         callbacks[fname] = []
+        _depth[fname] = 0
         def f(*args, **kwargs):
+            if _recorder is not None:
+                _recorder.callback(fname, args)
             retval = True
-            for fn in callbacks[fname]:
-                ret = fn(*args, **kwargs)
-                if isinstance(ret, bool):
-                    retval = retval and ret
-                elif isinstance(ret, str): # on_incoming_connection return str change player name
-                    retval = ret
+            _depth[fname] += 1
+            try:
+                for fn in callbacks[fname]:
+                    ret = fn(*args, **kwargs)
+                    if isinstance(ret, bool):
+                        retval = retval and ret
+                    elif isinstance(ret, str): # on_incoming_connection return str change player name
+                        retval = ret
+            finally:
+                _depth[fname] -= 1
+                if fname in _removed and not _depth[fname]:
+                    _removed.discard(fname)
+                    callbacks[fname] = [fn for fn in callbacks[fname] if fn is not _unregistered]
             return retval
         setattr(_vcmp.callbacks, fname, f)
     callbacks[fname].append(func)
     return func
+
+def remove_callback(func):
+    """Unregister a handler, also from within a dispatch of its callback.
+
+    During a dispatch the handler's slot is blanked rather than the list
+    changed, so handlers appended meanwhile (e.g. by a module imported from
+    a handler) still run; the list is compacted when the dispatch ends.
+    """
+    fname = func.__name__
+    handlers = callbacks.get(fname, [])
+    if func not in handlers:
+        return
+    if _depth.get(fname):
+        handlers[handlers.index(func)] = _unregistered
+        _removed.add(fname)
+    else:
+        handlers.remove(func)
+
+def start_recording(path, **kwargs):
+    """Log every callback and native getter result to path, see vcmp.record."""
+    global _recorder, _recorded_functions
+    from .record import Recorder, wrap_functions
+    stop_recording()
+    _recorder = Recorder(path, **kwargs)
+    _recorded_functions = wrap_functions(_vcmp.functions, _recorder)
+
+def stop_recording():
+    global _recorder, _recorded_functions
+    if _recorder is None:
+        return
+    for name, fn in _recorded_functions.items():
+        setattr(_vcmp.functions, name, fn)
+    _recorded_functions = {}
+    _recorder.flush()
+    _recorder = None
@@ -0,0 +1,185 @@
+# pylint: disable=missing-docstring
+
+import re
+from collections import OrderedDict
+from ipaddress import ip_address, ip_network
+from time import monotonic
+from typing import Callable, List, Optional, Union
+
+from _vcmp import functions as func
+
+MAX_NAME_LENGTH = 24
+
+_name_invalid_chars = re.compile(r'[^0-9A-Za-z_\-\.\[\]\(\)\{\}\$@=]')
+
+class IPBanTree:
+    """Binary radix tree of banned networks, one root per address family."""
+
+    def __init__(self):
+        self._roots = {4: [None, None, False], 6: [None, None, False]}
+        self._count = 0
+
+    @staticmethod
+    def _bits(network):
+        value = int(network.network_address)
+        width = network.max_prefixlen
+        for i in range(network.prefixlen):
+            yield (value >> (width - 1 - i)) & 1
+
+    def ban(self, network: str) -> None:
+        network = ip_network(network, strict=False)
+        node = self._roots[network.version]
+        for bit in self._bits(network):
+            if node[bit] is None:
+                node[bit] = [None, None, False]
+            node = node[bit]
+        if not node[2]:
+            node[2] = True
+            self._count += 1
+
+    def unban(self, network: str) -> bool:
+        network = ip_network(network, strict=False)
+        node = self._roots[network.version]
+        for bit in self._bits(network):
+            node = node[bit]
+            if node is None:
+                return False
+        if not node[2]:
+            return False
+        node[2] = False
+        self._count -= 1
+        return True
+
+    def __contains__(self, address: str) -> bool:
+        try:
+            address = ip_address(address)
+        except ValueError:
+            return False
+        node = self._roots[address.version]
+        value = int(address)
+        width = address.max_prefixlen
+        for i in range(width - 1, -1, -1):
+            if node[2]:
+                return True
+            node = node[(value >> i) & 1]
+            if node is None:
+                return False
+        return node[2]
+
+    def __len__(self):
+        return self._count
+
+class Throttle:
+    """Token bucket per IP address: `burst` attempts, refilled at `rate` per second.
+
+    At most `max_entries` buckets are kept; the least recently seen address
+    is forgotten first, so inserts stay O(1) during an address spray.
+    """
+
+    def __init__(self, rate=0.5, burst=3, max_entries=4096):
+        self.rate = rate
+        self.burst = burst
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def allow(self, ip: str, now: Optional[float] = None) -> bool:
+        if now is None:
+            now = monotonic()
+        bucket = self._buckets.get(ip)
+        if bucket is None:
+            if len(self._buckets) >= self.max_entries:
+                self._buckets.popitem(last=False)
+            self._buckets[ip] = [self.burst - 1.0, now]
+            return True
+        self._buckets.move_to_end(ip)
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens < 1.0:
+            bucket[0] = tokens
+            return False
+        bucket[0] = tokens - 1.0
+        return True
+
+    def prune(self, now: Optional[float] = None) -> None:
+        """Forget buckets that have refilled completely."""
+        if now is None:
+            now = monotonic()
+        full = self.burst / self.rate if self.rate > 0 else 0.0
+        buckets = self._buckets
+        # Least recently seen first, so stop at the first one still refilling
+        while buckets:
+            ip, bucket = next(iter(buckets.items()))
+            if now - bucket[1] < full:
+                break
+            del buckets[ip]
+
+def normalise_name(name: str, max_length=MAX_NAME_LENGTH) -> str:
+    return _name_invalid_chars.sub('_', name.strip())[:max_length]
+
+class Admission:
+    """Admission pipeline for on_incoming_connection.
+
+    Runs the throttle, the IP ban tree and the name checks in that order, and
+    remembers the outcome of the deterministic checks (bans and names) per
+    (ip, name) so reconnect storms skip the work.
+    Returns False to reject, True to accept or the normalised name to rename.
+    """
+
+    def __init__(self, throttle: Optional[Throttle] = None, cache_size=1024, cache_ttl=30.0):
+        self.bans = IPBanTree()
+        self.throttle = throttle if throttle is not None else Throttle()
+        self.name_checks = [] # type: List[Callable[[str], bool]]
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._cache = OrderedDict()
+
+    def ban_ip(self, network: str) -> None:
+        network = ip_network(network, strict=False)
+        self.bans.ban(network)
+        if network.num_addresses == 1:
+            func.ban_ip(str(network.network_address))
+        self.clear_cache()
+
+    def unban_ip(self, network: str) -> None:
+        network = ip_network(network, strict=False)
+        self.bans.unban(network)
+        if network.num_addresses == 1:
+            func.unban_ip(str(network.network_address))
+        self.clear_cache()
+
+    def is_ip_banned(self, ip: str) -> bool:
+        return ip in self.bans
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+
+    def _verdict(self, name: str, name_size: int, ip: str) -> Union[bool, str]:
+        if ip in self.bans:
+            return False
+        new_name = normalise_name(name, min(MAX_NAME_LENGTH, name_size - 1) if name_size > 0 else MAX_NAME_LENGTH)
+        if not new_name:
+            return False
+        for check in self.name_checks:
+            if check(new_name):
+                return False
+        return new_name if new_name != name else True
+
+    def check(self, name: str, name_size: int, password: str, ip: str, now: Optional[float] = None) -> Union[bool, str]: # pylint: disable=unused-argument
+        if now is None:
+            now = monotonic()
+        if not self.throttle.allow(ip, now):
+            return False
+        key = (ip, name)
+        cached = self._cache.get(key)
+        if cached is not None and cached[1] > now:
+            self._cache.move_to_end(key)
+            return cached[0]
+        verdict = self._verdict(name, name_size, ip)
+        self._cache[key] = (verdict, now + self.cache_ttl)
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return verdict
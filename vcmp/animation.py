@@ -0,0 +1,145 @@
+# pylint: disable=missing-docstring
+
+import heapq
+from array import array
+from time import monotonic
+from typing import List, Optional, Sequence, Tuple, Union
+
+from _vcmp import functions as func
+from .object import Object
+
+# Keyframe: (duration_ms, position or None, rotation or None); rotation is a
+# quaternion (x, y, z, w) or euler angles (x, y, z). None keeps the previous.
+Keyframe = Tuple[int, Optional[Sequence[float]], Optional[Sequence[float]]]
+
+# Compiled segment: (duration_ms, move args or None, rotate args or None)
+_Segment = tuple
+
+def compile_track(keyframes: Sequence[Keyframe], loop: bool = False) -> List[_Segment]:
+    """Turn keyframes into native calls, dropping moves and rotations to where the object already is."""
+    segments = []
+    if not keyframes:
+        return segments
+    if loop and not any(k[0] > 0 for k in keyframes):
+        raise ValueError('a looping track needs a non-zero duration')
+    last_pos = last_rot = None
+    if loop: # a loop starts where its last keyframe ends
+        for _, pos, rot in keyframes:
+            last_pos = tuple(pos) if pos is not None else last_pos
+            last_rot = tuple(rot) if rot is not None else last_rot
+    for duration, pos, rot in keyframes:
+        duration = int(duration)
+        move = rotate = None
+        if pos is not None and tuple(pos) != last_pos:
+            last_pos = tuple(pos)
+            move = last_pos + (duration,)
+        if rot is not None and tuple(rot) != last_rot:
+            last_rot = tuple(rot)
+            rotate = last_rot + (duration,)
+        segments.append((duration, move, rotate))
+    return segments
+
+class Animator:
+    """Keyframe animations for objects, using native move/rotate durations.
+
+    Each segment is one move_object_to and/or rotate_object_to call; the
+    object is then left to the server until the segment's duration ends.
+    State lives in fixed-capacity arrays indexed by slot and due segments are
+    taken from a heap, so on_frame only touches animations that need a call.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self._object = array('i', [-1]) * capacity
+        self._segment = array('i', bytes(capacity * 4))
+        self._due = array('d', bytes(capacity * 8))
+        self._gen = array('i', bytes(capacity * 4))
+        self._loop = bytearray(capacity)
+        self._track = [None] * capacity # type: List[Optional[List[_Segment]]]
+        self._free = list(range(capacity - 1, -1, -1))
+        self._by_object = {}
+        self._heap = [] # (due, slot, generation)
+
+    def __len__(self):
+        return self.capacity - len(self._free)
+
+    def play(self, obj: Union[Object, int], keyframes: Union[Sequence[Keyframe], List[_Segment]], loop: bool = False,
+             delay: int = 0, compiled: bool = False, now: Optional[float] = None) -> int:
+        """Start animating obj; returns the slot, or -1 for an empty track or when every slot is in use.
+
+        Pass compiled=True to share a compile_track result.
+        """
+        object_id = obj.id if isinstance(obj, Object) else obj
+        self.stop(object_id)
+        track = keyframes if compiled else compile_track(keyframes, loop)
+        if not track or not self._free:
+            return -1
+        slot = self._free.pop()
+        if now is None:
+            now = monotonic() * 1000.0
+        self._object[slot] = object_id
+        self._segment[slot] = -1
+        self._due[slot] = now + delay
+        self._gen[slot] += 1
+        self._loop[slot] = loop
+        self._track[slot] = track
+        self._by_object[object_id] = slot
+        heapq.heappush(self._heap, (now + delay, slot, self._gen[slot]))
+        return slot
+
+    def stop(self, obj: Union[Object, int]) -> bool:
+        """Stop issuing segments; a segment in progress still finishes."""
+        object_id = obj.id if isinstance(obj, Object) else obj
+        slot = self._by_object.pop(object_id, None)
+        if slot is None:
+            return False
+        self._object[slot] = -1
+        self._track[slot] = None
+        self._gen[slot] += 1 # invalidates its heap entry
+        self._free.append(slot)
+        return True
+
+    def is_playing(self, obj: Union[Object, int]) -> bool:
+        return (obj.id if isinstance(obj, Object) else obj) in self._by_object
+
+    def on_frame(self, now: Optional[float] = None) -> int:
+        """Issue every due segment; returns the number of segments started."""
+        heap = self._heap
+        if not heap:
+            return 0
+        if now is None:
+            now = monotonic() * 1000.0
+        started = 0
+        move = func.move_object_to
+        rotate = func.rotate_object_to
+        rotate_euler = func.rotate_object_to_euler
+        while heap and heap[0][0] <= now:
+            due, slot, gen = heapq.heappop(heap)
+            if gen != self._gen[slot]:
+                continue
+            track = self._track[slot]
+            i = self._segment[slot] + 1
+            if i == len(track):
+                if not self._loop[slot]:
+                    self.stop(self._object[slot])
+                    continue
+                i = 0
+            duration, move_args, rotate_args = track[i]
+            object_id = self._object[slot]
+            if move_args is not None:
+                move(object_id, *move_args)
+            if rotate_args is not None:
+                if len(rotate_args) == 5:
+                    rotate(object_id, *rotate_args)
+                else:
+                    rotate_euler(object_id, *rotate_args)
+            started += 1
+            self._segment[slot] = i
+            # Schedule from the planned time so frame jitter does not drift,
+            # unless we fell more than a segment behind
+            due += duration
+            if due < now:
+                due = now + duration
+            self._due[slot] = due
+            heapq.heappush(heap, (due, slot, gen))
+        return started
@@ -0,0 +1,209 @@
+# pylint: disable=missing-docstring
+
+from array import array
+from time import monotonic, perf_counter
+from typing import Callable, Dict, Tuple
+
+from _vcmp import functions as func
+from .utils import MAX_PLAYERS, MAX_VEHICLES
+
+RING_SIZE = 64
+
+# Sample fields: time, x, y, z, speed z, health, in vehicle
+_FIELDS = 7
+_T, _X, _Y, _Z, _VZ, _HP, _VEH = range(_FIELDS)
+
+SPEED = 'speed'
+TELEPORT = 'teleport'
+HEALTH = 'health'
+FLY = 'fly'
+VEHICLE_WARP = 'vehicle_warp'
+
+class AntiCheat:
+    """Cheat detectors fed by on_player_update and on_vehicle_update.
+
+    Every player update pushes one sample into a fixed-size ring buffer and
+    runs the cheap incremental detectors (speed, teleport, health). Speed is
+    measured over at least `speed_window` seconds of samples, since two
+    updates can be handled back to back. Checks
+    that scan the ring buffer (fly) run from on_frame, round robin over
+    players until `budget` seconds of the frame are spent.
+    Findings are passed to report(player_id, kind, value), at most once per
+    `cooldown` seconds per player and kind.
+    """
+
+    max_foot_speed = 12.0 # units per second, sprinting is ~8
+    speed_window = 0.5 # seconds
+    teleport_distance = 50.0 # on top of the max speed times the sample gap
+    max_health = 100.0 # pickups and the like heal up to this without healed()
+    fly_height = 15.0
+    fly_min_time = 2.0
+    max_vehicle_speed = 120.0
+    warp_distance = 80.0
+
+    def __init__(self, report: Callable[[int, str, float], None], budget: float = 0.001, cooldown: float = 10.0):
+        self.report = report
+        self.budget = budget
+        self.cooldown = cooldown
+        self._ring = array('d', bytes(MAX_PLAYERS * RING_SIZE * _FIELDS * 8))
+        self._head = array('i', bytes(MAX_PLAYERS * 4))
+        self._count = array('i', bytes(MAX_PLAYERS * 4))
+        self._skip = bytearray(MAX_PLAYERS)
+        self._heal = bytearray(MAX_PLAYERS)
+        self._vehicle = array('d', bytes(MAX_VEHICLES * 4 * 8)) # time, x, y, z
+        self._vehicle_skip = bytearray(MAX_VEHICLES)
+        self._reported = {} # type: Dict[Tuple[int, str], float]
+        self._next = 0
+
+    # Server-initiated changes which must not be flagged
+
+    def teleported(self, player_id: int) -> None:
+        self._skip[player_id] = 1
+
+    def healed(self, player_id: int) -> None:
+        self._heal[player_id] = 1
+
+    def vehicle_teleported(self, vehicle_id: int) -> None:
+        self._vehicle_skip[vehicle_id] = 1
+        self._vehicle[vehicle_id * 4] = 0.0
+
+    def reset(self, player_id: int) -> None:
+        self._count[player_id] = 0
+        self._skip[player_id] = 0
+        self._heal[player_id] = 0
+        for key in [k for k in self._reported if k[0] == player_id]:
+            del self._reported[key]
+
+    def _flag(self, player_id: int, kind: str, value: float, now: float) -> None:
+        key = (player_id, kind)
+        if now - self._reported.get(key, -self.cooldown) >= self.cooldown:
+            self._reported[key] = now
+            self.report(player_id, kind, value)
+
+    # Incremental detectors
+
+    def on_player_update(self, player_id: int, now: float = None) -> None:
+        pos = func.get_player_position(player_id)
+        if pos is None:
+            return
+        if now is None:
+            now = monotonic()
+        speed = func.get_player_speed(player_id)
+        health = func.get_player_health(player_id)
+        in_vehicle = func.get_player_vehicle_id(player_id) != 0
+
+        ring = self._ring
+        head = self._head[player_id]
+        base = (player_id * RING_SIZE + head) * _FIELDS
+        count = self._count[player_id]
+        if self._skip[player_id]:
+            # Samples from before a server move say nothing about this one
+            count = 0
+        elif count:
+            prev = (player_id * RING_SIZE + (head - 1) % RING_SIZE) * _FIELDS
+            dx = pos[0] - ring[prev + _X]
+            dy = pos[1] - ring[prev + _Y]
+            dz = pos[2] - ring[prev + _Z]
+            dist = (dx * dx + dy * dy + dz * dz) ** 0.5
+            # Allow for the distance covered at full speed since the last
+            # sample, so a sync gap is not a teleport
+            dt = now - ring[prev + _T]
+            max_speed = self.max_vehicle_speed if in_vehicle or ring[prev + _VEH] else self.max_foot_speed
+            if dist > self.teleport_distance + max_speed * dt:
+                self._flag(player_id, TELEPORT, dist, now)
+            elif not in_vehicle:
+                self._check_speed(player_id, pos, now, head, count)
+            if not self._heal[player_id] and health > self.max_health and health > ring[prev + _HP]:
+                self._flag(player_id, HEALTH, health - ring[prev + _HP], now)
+        self._skip[player_id] = 0
+        self._heal[player_id] = 0
+
+        ring[base + _T] = now
+        ring[base + _X], ring[base + _Y], ring[base + _Z] = pos
+        ring[base + _VZ] = speed[2] if speed is not None else 0.0
+        ring[base + _HP] = health
+        ring[base + _VEH] = 1.0 if in_vehicle else 0.0
+        self._head[player_id] = (head + 1) % RING_SIZE
+        if count < RING_SIZE:
+            self._count[player_id] = count + 1
+
+    def _check_speed(self, player_id: int, pos, now: float, head: int, count: int) -> None:
+        # Oldest on-foot sample within the window, stopping at the first one
+        # old enough; give up if the player was in a vehicle meanwhile
+        ring = self._ring
+        start = player_id * RING_SIZE
+        for k in range(1, count + 1):
+            j = (start + (head - k) % RING_SIZE) * _FIELDS
+            if ring[j + _VEH]:
+                return
+            dt = now - ring[j + _T]
+            if dt >= self.speed_window:
+                dx = pos[0] - ring[j + _X]
+                dy = pos[1] - ring[j + _Y]
+                v = (dx * dx + dy * dy) ** 0.5 / dt
+                if v > self.max_foot_speed:
+                    self._flag(player_id, SPEED, v, now)
+                return
+
+    def on_vehicle_update(self, vehicle_id: int, now: float = None) -> None:
+        pos = func.get_vehicle_position(vehicle_id)
+        if pos is None:
+            return
+        if now is None:
+            now = monotonic()
+        last = self._vehicle
+        i = vehicle_id * 4
+        if last[i] and not self._vehicle_skip[vehicle_id]:
+            dt = now - last[i]
+            dx = pos[0] - last[i + 1]
+            dy = pos[1] - last[i + 2]
+            dz = pos[2] - last[i + 3]
+            dist = (dx * dx + dy * dy + dz * dz) ** 0.5
+            if dist > self.warp_distance and dt > 0.0 and dist / dt > self.max_vehicle_speed:
+                player_id = func.get_vehicle_sync_source(vehicle_id)
+                if 0 <= player_id < MAX_PLAYERS:
+                    self._flag(player_id, VEHICLE_WARP, dist, now)
+        self._vehicle_skip[vehicle_id] = 0
+        last[i] = now
+        last[i + 1], last[i + 2], last[i + 3] = pos
+
+    def on_vehicle_respawn(self, vehicle_id: int) -> None:
+        self._vehicle[vehicle_id * 4] = 0.0
+
+    # Frame-spread detectors
+
+    def check_fly(self, player_id: int, now: float) -> None:
+        count = self._count[player_id]
+        if count < 2:
+            return
+        ring = self._ring
+        head = self._head[player_id]
+        start = player_id * RING_SIZE
+        first = (start + (head - count) % RING_SIZE) * _FIELDS
+        if ring[first + _VEH]:
+            return
+        z0 = ring[first + _Z]
+        t0 = ring[first + _T]
+        z = z0
+        for k in range(1, count):
+            j = (start + (head - count + k) % RING_SIZE) * _FIELDS
+            # Any vehicle ride or fall means it is not sustained flight
+            if ring[j + _VEH] or ring[j + _VZ] < -0.5 or ring[j + _Z] < z - 0.5:
+                return
+            z = ring[j + _Z]
+        last = (start + (head - 1) % RING_SIZE) * _FIELDS
+        if z - z0 > self.fly_height and ring[last + _T] - t0 > self.fly_min_time:
+            self._flag(player_id, FLY, z - z0, now)
+
+    def on_frame(self) -> None:
+        deadline = perf_counter() + self.budget
+        now = monotonic()
+        count = self._count
+        i = self._next
+        for _ in range(MAX_PLAYERS):
+            if count[i]:
+                self.check_fly(i, now)
+            i = (i + 1) % MAX_PLAYERS
+            if perf_counter() > deadline:
+                break
+        self._next = i
@@ -0,0 +1,165 @@
+# pylint: disable=missing-docstring
+
+import hmac
+from hashlib import sha256
+from hmac import compare_digest
+from os import urandom
+from typing import Dict, List, Optional, Tuple
+
+MAC_SIZE = 8
+SECRET_SIZE = 32
+
+_SEQUENCE = 0x30
+_INTEGER = 0x02
+_OCTET_STRING = 0x04
+_BIT_STRING = 0x03
+_RSA_ALGORITHM = bytes.fromhex('300d06092a864886f70d0101010500')
+
+def _der_read(data: bytes, pos: int) -> Tuple[int, bytes, int]:
+    tag = data[pos]
+    length = data[pos + 1]
+    pos += 2
+    if length & 0x80:
+        n = length & 0x7f
+        length = int.from_bytes(data[pos:pos + n], 'big')
+        pos += n
+    return tag, data[pos:pos + length], pos + length
+
+def _der_children(data: bytes) -> List[Tuple[int, bytes]]:
+    children = []
+    pos = 0
+    while pos < len(data):
+        tag, value, pos = _der_read(data, pos)
+        children.append((tag, value))
+    return children
+
+def _der(tag: int, value: bytes) -> bytes:
+    length = len(value)
+    if length < 0x80:
+        return bytes([tag, length]) + value
+    n = (length.bit_length() + 7) // 8
+    return bytes([tag, 0x80 | n]) + length.to_bytes(n, 'big') + value
+
+def _der_int(value: int) -> bytes:
+    return _der(_INTEGER, value.to_bytes(value.bit_length() // 8 + 1, 'big'))
+
+class RSAPrivateKey:
+    """RSA private key, compatible with client_script/sqrsa (PKCS #1 v1.5 padding)."""
+
+    def __init__(self, n: int, e: int, d: int, p: int, q: int):
+        self.n = n
+        self.e = e
+        self.d = d
+        self.p = p
+        self.q = q
+        self._dp = d % (p - 1)
+        self._dq = d % (q - 1)
+        self._qinv = pow(q, p - 2, p)
+        self.size = (n.bit_length() + 7) // 8
+
+    @classmethod
+    def from_der(cls, data: bytes) -> 'RSAPrivateKey':
+        """Load a PKCS #8 or PKCS #1 DER private key."""
+        _, body, _ = _der_read(data, 0)
+        children = _der_children(body)
+        if len(children) == 3 and children[2][0] == _OCTET_STRING: # PKCS #8
+            _, body, _ = _der_read(children[2][1], 0)
+            children = _der_children(body)
+        n, e, d, p, q = (int.from_bytes(v, 'big') for _, v in children[1:6])
+        return cls(n, e, d, p, q)
+
+    @classmethod
+    def load(cls, path: str) -> 'RSAPrivateKey':
+        with open(path, 'rb') as f:
+            data = f.read()
+        try:
+            data = bytes.fromhex(data.decode('ascii'))
+        except ValueError:
+            pass
+        return cls.from_der(data)
+
+    def public_der(self) -> bytes:
+        """SubjectPublicKeyInfo, the form sqrsa's RsaAlgorithm.encrypt takes."""
+        key = _der(_SEQUENCE, _der_int(self.n) + _der_int(self.e))
+        return _der(_SEQUENCE, _RSA_ALGORITHM + _der(_BIT_STRING, b'\0' + key))
+
+    def encrypt(self, data: bytes) -> bytes:
+        pad = self.size - 3 - len(data)
+        if pad < 8:
+            raise ValueError('data too long')
+        padding = bytes(b % 255 + 1 for b in urandom(pad))
+        m = int.from_bytes(b'\0\2' + padding + b'\0' + data, 'big')
+        return pow(m, self.e, self.n).to_bytes(self.size, 'big')
+
+    def decrypt(self, data: bytes) -> Optional[bytes]:
+        c = int.from_bytes(data, 'big')
+        if c >= self.n:
+            return None
+        # Chinese remainder theorem, about 3x faster than pow(c, d, n)
+        m1 = pow(c, self._dp, self.p)
+        m2 = pow(c, self._dq, self.q)
+        m = m2 + (self._qinv * (m1 - m2) % self.p) * self.q
+        padded = m.to_bytes(self.size, 'big')
+        if padded[0] != 0 or padded[1] != 2:
+            return None
+        end = padded.find(b'\0', 2)
+        if end < 10:
+            return None
+        return padded[end + 1:]
+
+class Sessions:
+    """Per-player message keys set up by one RSA exchange.
+
+    The client sends a random secret encrypted with the server public key,
+    then prefixes every message with the first MAC_SIZE bytes of an
+    HMAC-SHA256 over its sequence number and payload. Sequence numbers are
+    implicit and count up from 0 on both sides, so replayed or dropped
+    messages fail to verify. client_script/session.nut is the client side;
+    SHA-256 only needs 32-bit integers, which Squirrel has.
+    """
+
+    def __init__(self, key: RSAPrivateKey):
+        self.key = key
+        self._sessions = {} # type: Dict[int, List]
+
+    def handshake(self, player_id: int, data: bytes) -> bool:
+        secret = self.key.decrypt(data)
+        if secret is None or len(secret) < 16:
+            return False
+        key = hmac.new(secret, b'vcmp-session', sha256).digest()
+        self._sessions[player_id] = [key, 0, 0]
+        return True
+
+    def has_session(self, player_id: int) -> bool:
+        return player_id in self._sessions
+
+    def drop(self, player_id: int) -> None:
+        self._sessions.pop(player_id, None)
+
+    def clear(self) -> None:
+        self._sessions.clear()
+
+    @staticmethod
+    def _tag(key: bytes, seq: int, payload: bytes) -> bytes:
+        h = hmac.new(key, seq.to_bytes(4, 'little'), sha256)
+        h.update(payload)
+        return h.digest()[:MAC_SIZE]
+
+    def verify(self, player_id: int, data: bytes) -> Optional[bytes]:
+        """Return the payload of an authentic message, otherwise None."""
+        session = self._sessions.get(player_id)
+        if session is None or len(data) < MAC_SIZE:
+            return None
+        payload = data[MAC_SIZE:]
+        if not compare_digest(data[:MAC_SIZE], self._tag(session[0], session[1], payload)):
+            return None
+        session[1] += 1
+        return payload
+
+    def sign(self, player_id: int, payload: bytes) -> Optional[bytes]:
+        session = self._sessions.get(player_id)
+        if session is None:
+            return None
+        tag = self._tag(session[0], session[2] | 0x80000000, payload)
+        session[2] += 1
+        return tag + payload
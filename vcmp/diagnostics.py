@@ -0,0 +1,144 @@
+# pylint: disable=missing-docstring
+
+import gc
+import sys
+import tracemalloc
+import weakref
+from array import array
+from typing import Callable, Dict, List, Optional
+
+class MemoryMonitor:
+    """Per-module memory accounting with tracemalloc.
+
+    Every `interval` seconds of on_frame time a snapshot is taken and the
+    allocations are summed per module (the file of the allocating frame),
+    then the `top` biggest changes since the previous snapshot are logged.
+    tracemalloc slows allocation down, so only run it while investigating.
+    """
+
+    def __init__(self, interval: float = 300.0, top: int = 10, log: Callable[[str], None] = print):
+        self.interval = interval
+        self.top = top
+        self.log = log
+        self._elapsed = 0.0
+        self._modules = {} # type: Dict[str, str]
+        self._last = None # type: Optional[Dict[str, int]]
+
+    def start(self, frames: int = 1) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        self._last = None
+
+    def _module(self, filename: str) -> str:
+        name = self._modules.get(filename)
+        if name is None:
+            for mod_name, mod in list(sys.modules.items()):
+                path = getattr(mod, '__file__', None)
+                if path:
+                    self._modules.setdefault(path, mod_name)
+            name = self._modules.setdefault(filename, filename)
+        return name
+
+    def usage(self) -> Dict[str, int]:
+        """Bytes currently allocated per module."""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        usage = {} # type: Dict[str, int]
+        for stat in snapshot.statistics('filename'):
+            name = self._module(stat.traceback[0].filename)
+            usage[name] = usage.get(name, 0) + stat.size
+        return usage
+
+    def report(self) -> List[str]:
+        usage = self.usage()
+        last = self._last or {}
+        self._last = usage
+        diff = sorted(((size - last.get(name, 0), size, name) for name, size in usage.items()), key=lambda x: -abs(x[0]))
+        lines = ['memory: %d KiB traced' % (sum(usage.values()) // 1024)]
+        for delta, size, name in diff[:self.top]:
+            lines.append('  %-40s %10d KiB %+10d KiB' % (name, size // 1024, delta // 1024))
+        return lines
+
+    def on_frame(self, elapsed_time: float) -> None:
+        if not tracemalloc.is_tracing():
+            return
+        self._elapsed += elapsed_time
+        if self._elapsed < self.interval:
+            return
+        self._elapsed = 0.0
+        for line in self.report():
+            self.log(line)
+
+class LeakDetector:
+    """Finds per-player state that outlives on_player_disconnect.
+
+    Watched containers are checked `grace` seconds after a disconnect (unless
+    the id is reused first):
+    - dict: a key equal to the player id, or a tuple key starting with it
+    - list indexed by player id: the slot is not None
+    - array / bytearray indexed by player id: the slot is not 0
+    - callable: fn(player_id) returns True while something is still held
+    Objects passed to track() must also be garbage by then.
+    """
+
+    def __init__(self, grace: float = 5.0, log: Callable[[str], None] = print):
+        self.grace = grace
+        self.log = log
+        self.leaks = 0
+        self._watched = {} # type: Dict[str, object]
+        self._tracked = {} # type: Dict[int, List[weakref.ref]]
+        self._pending = {} # type: Dict[int, float]
+        self._time = 0.0
+
+    def watch(self, name: str, container) -> None:
+        self._watched[name] = container
+
+    def track(self, obj, player_id: int) -> None:
+        self._tracked.setdefault(player_id, []).append(weakref.ref(obj))
+
+    @staticmethod
+    def holds(container, player_id: int) -> bool:
+        if callable(container):
+            return bool(container(player_id))
+        if isinstance(container, dict):
+            if player_id in container:
+                return True
+            return any(isinstance(k, tuple) and k and k[0] == player_id for k in container)
+        if player_id >= len(container):
+            return False
+        if isinstance(container, (array, bytearray)):
+            return container[player_id] != 0 # these slots can never be None
+        return container[player_id] is not None
+
+    def check(self, player_id: int) -> List[str]:
+        leaks = [name for name, container in self._watched.items() if self.holds(container, player_id)]
+        refs = self._tracked.pop(player_id, [])
+        if any(ref() is not None for ref in refs):
+            gc.collect()
+            for ref in refs:
+                obj = ref()
+                if obj is not None:
+                    leaks.append(type(obj).__name__)
+        return leaks
+
+    def on_connect(self, player_id: int) -> None:
+        self._pending.pop(player_id, None)
+
+    def on_disconnect(self, player_id: int) -> None:
+        self._pending[player_id] = self._time + self.grace
+
+    def on_frame(self, elapsed_time: float) -> None:
+        self._time += elapsed_time
+        if not self._pending:
+            return
+        for player_id in [p for p, t in self._pending.items() if t <= self._time]:
+            del self._pending[player_id]
+            leaks = self.check(player_id)
+            if leaks:
+                self.leaks += len(leaks)
+                self.log('leak: player %d still held by %s' % (player_id, ', '.join(leaks)))
@@ -35,3 +35,11 @@ class PlayerOption(IntEnum):
     HasMarker = 7
     ChatTagsEnabled = 8
     DrunkEffects = 9
+
+class EntityPool(IntEnum):
+    Vehicle = 1
+    Object = 2
+    Pickup = 3
+    Radio = 4
+    Blip = 7
+    CheckPoint = 8
@@ -0,0 +1,163 @@
+# pylint: disable=missing-docstring
+
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+from _vcmp import functions as func
+
+# Cache keys: (HANDLING, model, rule) and (WEAPON, weapon, field)
+HANDLING = 0
+WEAPON = 1
+
+Preset = Dict[Tuple[int, int, int], float]
+
+def make_preset(vehicle_handling: Iterable[Sequence] = (), weapon_data_value: Iterable[Sequence] = ()) -> Preset:
+    """Build a preset from rows in the settings.yaml format."""
+    preset = {}
+    for model, rule, value in vehicle_handling:
+        preset[(HANDLING, model, rule)] = value
+    for weapon, field, value in weapon_data_value:
+        preset[(WEAPON, weapon, field)] = value
+    return preset
+
+class HandlingManager:
+    """Caches the effective handling rules and weapon data values.
+
+    Native setters are skipped when the value is already in effect. A preset
+    is applied as the diff against the current state, spread over frames
+    at `per_frame` native calls per on_frame.
+    """
+
+    def __init__(self, per_frame: int = 100):
+        self.per_frame = per_frame
+        self._values = {} # type: Preset
+        self._inst = {} # type: Dict[int, Dict[int, float]]
+        self._pending = OrderedDict() # type: OrderedDict
+
+    # Global handling and weapon data
+
+    def _set(self, key, value: Optional[float]) -> None:
+        if value is None:
+            if key not in self._values:
+                return
+            del self._values[key]
+            if key[0] == HANDLING:
+                func.reset_handling_rule(key[1], key[2])
+            else:
+                func.reset_weapon_data_value(key[1], key[2])
+        else:
+            if self._values.get(key) == value:
+                return
+            self._values[key] = value
+            if key[0] == HANDLING:
+                func.set_handling_rule(key[1], key[2], value)
+            else:
+                func.set_weapon_data_value(key[1], key[2], value)
+
+    def set_rule(self, model: int, rule: int, value: float) -> None:
+        key = (HANDLING, model, rule)
+        self._pending.pop(key, None)
+        self._set(key, value)
+
+    def reset_rule(self, model: int, rule: int) -> None:
+        key = (HANDLING, model, rule)
+        self._pending.pop(key, None)
+        self._set(key, None)
+
+    def get_rule(self, model: int, rule: int) -> float:
+        value = self._values.get((HANDLING, model, rule))
+        return func.get_handling_rule(model, rule) if value is None else value
+
+    def set_weapon_value(self, weapon: int, field: int, value: float) -> None:
+        key = (WEAPON, weapon, field)
+        self._pending.pop(key, None)
+        self._set(key, value)
+
+    def reset_weapon_value(self, weapon: int, field: int) -> None:
+        key = (WEAPON, weapon, field)
+        self._pending.pop(key, None)
+        self._set(key, None)
+
+    def reset_all(self) -> None:
+        self._pending.clear()
+        if any(key[0] == HANDLING for key in self._values):
+            func.reset_all_vehicle_handlings()
+        if any(key[0] == WEAPON for key in self._values):
+            func.reset_all_weapon_data()
+        self._values.clear()
+
+    # Presets
+
+    def diff(self, preset: Preset) -> OrderedDict:
+        """Native operations turning the current state into preset; None means reset."""
+        ops = OrderedDict()
+        for key in self._values:
+            if key not in preset:
+                ops[key] = None
+        for key, value in preset.items():
+            if self._values.get(key) != value:
+                ops[key] = value
+        return ops
+
+    def update(self, preset: Preset) -> None:
+        """Apply the entries of preset now, leaving other values alone."""
+        for key, value in preset.items():
+            self._pending.pop(key, None)
+            self._set(key, value)
+
+    def apply(self, preset: Preset, now: bool = False) -> int:
+        """Replace the global state with preset; returns the number of native calls queued."""
+        self._pending = self.diff(preset)
+        count = len(self._pending)
+        if now:
+            self.flush()
+        return count
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> None:
+        while self._pending:
+            self._set(*self._pending.popitem(last=False))
+
+    def on_frame(self) -> None:
+        pending = self._pending
+        for _ in range(min(self.per_frame, len(pending))):
+            self._set(*pending.popitem(last=False))
+
+    # Per-vehicle handling
+
+    def set_inst_rule(self, vehicle_id: int, rule: int, value: float) -> None:
+        rules = self._inst.setdefault(vehicle_id, {})
+        if rules.get(rule) == value:
+            return
+        rules[rule] = value
+        func.set_inst_handling_rule(vehicle_id, rule, value)
+
+    def reset_inst_rule(self, vehicle_id: int, rule: int) -> None:
+        rules = self._inst.get(vehicle_id)
+        if rules is None or rule not in rules:
+            return
+        del rules[rule]
+        func.reset_inst_handling_rule(vehicle_id, rule)
+
+    def get_inst_rule(self, vehicle_id: int, rule: int) -> float:
+        value = self._inst.get(vehicle_id, {}).get(rule)
+        return func.get_inst_handling_rule(vehicle_id, rule) if value is None else value
+
+    def reset_inst(self, vehicle_id: int) -> None:
+        if self._inst.pop(vehicle_id, None):
+            func.reset_inst_handling(vehicle_id)
+
+    def set_inst_rules(self, vehicle_id: int, rules: Dict[int, float]) -> None:
+        """Make rules the vehicle's complete instance handling."""
+        current = self._inst.get(vehicle_id, {})
+        for rule in [r for r in current if r not in rules]:
+            self.reset_inst_rule(vehicle_id, rule)
+        for rule, value in rules.items():
+            self.set_inst_rule(vehicle_id, rule, value)
+
+    def forget_vehicle(self, vehicle_id: int) -> None:
+        """Drop the cache of a deleted vehicle, without native calls."""
+        self._inst.pop(vehicle_id, None)
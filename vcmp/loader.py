@@ -0,0 +1,110 @@
+# pylint: disable=missing-docstring
+
+import json
+import sys
+import traceback
+from importlib import import_module
+from time import perf_counter
+from typing import Dict, List
+
+from . import callback, remove_callback
+
+class Loader:
+    """Import gamemode modules on first use.
+
+    A manifest maps module names (relative to `package`) to the callbacks and
+    commands they handle:
+
+        {"teleport": {"callbacks": ["on_checkpoint_entered"]},
+         "admin": {"commands": ["kick", "ban"]}}
+
+    A placeholder handler is registered for every listed callback. When one
+    of them first fires, or on_player_command sees a listed command, the
+    module is imported. Its own @vcmp.callback handlers are appended to the
+    list being dispatched, so they still see the event that loaded them.
+    Callbacks missing from the manifest are only registered once the module
+    is imported some other way.
+
+    Modules that need another gamemode module at startup should get it with
+    load() rather than a top-level import, so it is timed on its own and
+    stays unloaded when it is not needed. import_times are exclusive of
+    modules loaded from within the import.
+    """
+
+    def __init__(self, package: str, verbose: bool = True):
+        self.package = package
+        self.verbose = verbose
+        self.import_times = {} # type: Dict[str, float]
+        self._stubs = {} # type: Dict[str, List]
+        self._commands = {} # type: Dict[str, str]
+        self._loaded = set()
+        self._nested = [] # time spent in loads nested in the current one
+
+    def load_manifest(self, path: str) -> None:
+        with open(path, 'r') as f:
+            self.register(json.load(f))
+
+    def register(self, manifest: Dict[str, Dict[str, List[str]]]) -> None:
+        for module, entry in manifest.items():
+            for fname in entry.get('callbacks', []):
+                self._add_stub(module, fname)
+            for cmd in entry.get('commands', []):
+                if not self._commands:
+                    self._add_stub(None, 'on_player_command')
+                self._commands[cmd] = module
+
+    def _add_stub(self, module, fname):
+        def stub(*args):
+            if module is None:
+                cmd = args[1].split(' ', 1)[0]
+                if cmd in self._commands:
+                    self.load(self._commands[cmd])
+            else:
+                self.load(module)
+        stub.__name__ = fname
+        stub.module = module
+        self._stubs.setdefault(module, []).append(stub)
+        callback(stub)
+
+    def _remove_stubs(self, module):
+        for stub in self._stubs.pop(module, []):
+            remove_callback(stub)
+
+    def _loaded_module(self, module):
+        self._loaded.add(module)
+        self._remove_stubs(module)
+        for cmd in [c for c, m in self._commands.items() if m == module]:
+            del self._commands[cmd]
+        if not self._commands:
+            self._remove_stubs(None)
+
+    def load(self, module: str):
+        """Import module; returns None (and stops retrying) if the import fails."""
+        name = '%s.%s' % (self.package, module)
+        if module in self._loaded:
+            return sys.modules.get(name)
+        if name in sys.modules: # imported by another module
+            self._loaded_module(module)
+            return sys.modules[name]
+        t = perf_counter()
+        self._nested.append(0.0)
+        try:
+            mod = import_module(name)
+        except Exception: # pylint: disable=broad-except
+            mod = None
+            print('failed to load %s' % name)
+            traceback.print_exc()
+        elapsed = perf_counter() - t
+        nested = self._nested.pop()
+        if self._nested:
+            self._nested[-1] += elapsed
+        self._loaded_module(module)
+        if mod is None:
+            return None
+        self.import_times[module] = elapsed - nested
+        if self.verbose:
+            print('loaded %s in %.2f ms' % (name, self.import_times[module] * 1e3))
+        return mod
+
+    def report(self) -> List[str]:
+        return ['%-24s %8.2f ms' % (m, t * 1e3) for m, t in sorted(self.import_times.items(), key=lambda x: -x[1])]
@@ -85,10 +85,10 @@ class Object:
         func.rotate_object_by(self._id, *rot_offset, time)
 
     def rotate_to_euler(self, rotation: Vector, time: int) -> None:
-        func.rotate_to_euler(self._id, *rotation, time)
+        func.rotate_object_to_euler(self._id, *rotation, time)
 
     def rotate_by_euler(self, rot_offset: Vector, time: int) -> None:
-        func.rotate_by_euler(self._id, *rot_offset, time)
+        func.rotate_object_by_euler(self._id, *rot_offset, time)
 
     def set_alpha(self, alpha: int, fade_time: int) -> None:
         func.set_object_alpha(self._id, alpha, fade_time)
@@ -0,0 +1,133 @@
+# pylint: disable=missing-docstring
+
+import multiprocessing
+import traceback
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, Optional
+
+def _block_size(size: int) -> int:
+    n = 4096
+    while n < size:
+        n <<= 1
+    return n
+
+def _run(fn, in_name: str, in_size: int, out_name: str, out_size: int, args: tuple) -> Any:
+    inp = SharedMemory(in_name)
+    out = SharedMemory(out_name)
+    try:
+        iv = inp.buf[:in_size]
+        ov = out.buf[:out_size]
+        try:
+            return fn(iv, ov, *args)
+        finally:
+            iv.release()
+            ov.release()
+    finally:
+        inp.close()
+        out.close()
+
+class _Job:
+    __slots__ = ('future', 'inp', 'out', 'out_size', 'done')
+
+    def __init__(self, future, inp, out, out_size, done):
+        self.future = future
+        self.inp = inp
+        self.out = out
+        self.out_size = out_size
+        self.done = done
+
+class Offload:
+    """Run CPU-heavy work in worker processes, passing data through shared memory.
+
+    submit() copies a snapshot into a shared input block and reserves a
+    shared output block; only the block names and `args` are pickled. The
+    worker calls fn(input, output, *args) with memoryviews of both blocks;
+    fn must be a module-level function. poll(), called from on_server_frame,
+    never blocks: for every finished job it calls done(output, ret) with a
+    memoryview that is only valid during the call, then recycles the blocks.
+
+    The server embeds Python, so sys.executable is the server itself; pass
+    `executable` (a python interpreter) to spawn workers with it.
+    """
+
+    def __init__(self, workers: int = 2, executable: Optional[str] = None):
+        self.workers = workers
+        self.executable = executable
+        self._pool = None
+        self._free = {} # type: Dict[int, List[SharedMemory]]
+        self._jobs = [] # type: List[_Job]
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            ctx = multiprocessing.get_context('spawn')
+            if self.executable:
+                ctx.set_executable(self.executable)
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=ctx)
+        return self._pool
+
+    def _alloc(self, size: int) -> SharedMemory:
+        size = _block_size(size)
+        free = self._free.get(size)
+        if free:
+            return free.pop()
+        return SharedMemory(create=True, size=size)
+
+    def _release(self, block: SharedMemory) -> None:
+        self._free.setdefault(block.size, []).append(block)
+
+    @property
+    def pending(self) -> int:
+        return len(self._jobs)
+
+    def submit(self, fn: Callable, snapshot, out_size: int, done: Callable[[memoryview, Any], None], *args) -> None:
+        data = memoryview(snapshot).cast('B')
+        inp = self._alloc(len(data))
+        out = self._alloc(out_size)
+        inp.buf[:len(data)] = data
+        future = self._get_pool().submit(_run, fn, inp.name, len(data), out.name, out_size, args)
+        self._jobs.append(_Job(future, inp, out, out_size, done))
+
+    def poll(self) -> int:
+        if not self._jobs:
+            return 0
+        finished = []
+        pending = []
+        for job in self._jobs:
+            (finished if job.future.done() else pending).append(job)
+        self._jobs = pending
+        for job in finished:
+            try:
+                ret = job.future.result()
+                view = job.out.buf[:job.out_size]
+                try:
+                    job.done(view, ret)
+                finally:
+                    view.release()
+            except Exception: # pylint: disable=broad-except
+                traceback.print_exc()
+            finally:
+                self._release(job.inp)
+                self._release(job.out)
+        return len(finished)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        self.poll()
+        for blocks in self._free.values():
+            for block in blocks:
+                block.close()
+                block.unlink()
+        self._free = {}
+
+# Ready-made jobs
+
+def argsort_desc(inp: memoryview, out: memoryview, typecode: str = 'd') -> int:
+    """Write the int32 indices that sort an array of `typecode` values, largest first."""
+    values = inp.cast(typecode)
+    order = sorted(range(len(values)), key=values.__getitem__, reverse=True)
+    out.cast('i')[:len(order)] = array('i', order)
+    return len(order)
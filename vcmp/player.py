@@ -1,6 +1,6 @@
 # pylint: disable=missing-docstring, line-too-long
 
-from typing import Tuple, Union
+from typing import Callable, List, Tuple, Union
 
 from math import nan
 
@@ -9,6 +9,10 @@ from .enum import PlayerOption
 
 Vector = Tuple[float, float, float]
 
+# Called as fn(player_id, value, relative) when changed through Player
+score_listeners = [] # type: List[Callable[[int, int, bool], None]]
+cash_listeners = [] # type: List[Callable[[int, int, bool], None]]
+
 class Player:
     def __init__(self, player_id):
         self._id = player_id
@@ -70,6 +74,8 @@ class Player:
     @cash.setter
     def cash(self, value):
         func.set_player_money(self._id, value)
+        for fn in cash_listeners:
+            fn(self._id, value, False)
 
     @property
     def color(self): # FIXME EntityRGB
@@ -222,6 +228,8 @@ class Player:
     @score.setter
     def score(self, value):
         func.set_player_score(self._id, value)
+        for fn in score_listeners:
+            fn(self._id, value, False)
 
     @property
     def sec_world(self):
@@ -468,6 +476,8 @@ class Player:
 
     def give_money(self, money: int) -> None:
         func.give_player_money(self._id, money)
+        for fn in cash_listeners:
+            fn(self._id, money, True)
 
     def give_weapon(self, weapon: int, ammo: int) -> None:
         func.give_player_weapon(self._id, weapon, ammo)
@@ -0,0 +1,321 @@
+# pylint: disable=missing-docstring
+
+import sqlite3
+from collections import defaultdict
+from random import random
+from struct import pack, unpack
+from typing import Dict, Hashable, List, Optional, Tuple
+
+MAX_LEVEL = 24
+
+class _Node:
+    __slots__ = ('key', 'value', 'next', 'width')
+
+    def __init__(self, key, value, level):
+        self.key = key
+        self.value = value
+        self.next = [None] * level
+        self.width = [1] * level
+
+class RankIndex:
+    """Indexable skip list ordered by value, highest first.
+
+    Ties are broken by insertion order. update, remove, rank and nth are
+    O(log n); top and around are O(log n + k).
+    """
+
+    def __init__(self):
+        self._head = _Node(None, None, MAX_LEVEL)
+        self._level = 1
+        self._values = {} # type: Dict[Hashable, Tuple[float, int]]
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def value(self, key) -> Optional[float]:
+        v = self._values.get(key)
+        return None if v is None else v[0]
+
+    @staticmethod
+    def _before(a, b) -> bool:
+        # Higher value first, then earlier insertion
+        return a[0] > b[0] or a[0] == b[0] and a[1] < b[1]
+
+    def _path(self, sort_key):
+        """Last node before sort_key on every level, and its 0-based rank."""
+        update = [None] * MAX_LEVEL
+        ranks = [0] * MAX_LEVEL
+        node = self._head
+        pos = -1
+        for level in range(self._level - 1, -1, -1):
+            nxt = node.next[level]
+            while nxt is not None and self._before(self._values[nxt.key], sort_key):
+                pos += node.width[level]
+                node = nxt
+                nxt = node.next[level]
+            update[level] = node
+            ranks[level] = pos
+        return update, ranks
+
+    def update(self, key, value: float) -> None:
+        if key in self._values:
+            if self._values[key][0] == value:
+                return
+            self.remove(key)
+        self._seq += 1
+        sort_key = (value, self._seq)
+        level = 1
+        while level < MAX_LEVEL and random() < 0.25:
+            level += 1
+        update, ranks = self._path(sort_key)
+        if level > self._level:
+            for i in range(self._level, level):
+                update[i] = self._head
+                ranks[i] = -1
+                self._head.width[i] = len(self._values) + 1
+            self._level = level
+        node = _Node(key, value, level)
+        self._values[key] = sort_key
+        pos = ranks[0] + 1
+        for i in range(level):
+            prev = update[i]
+            node.next[i] = prev.next[i]
+            prev.next[i] = node
+            node.width[i] = prev.width[i] - (pos - ranks[i]) + 1
+            prev.width[i] = pos - ranks[i]
+        for i in range(level, self._level):
+            update[i].width[i] += 1
+
+    def add(self, key, delta: float) -> None:
+        self.update(key, (self.value(key) or 0) + delta)
+
+    def remove(self, key) -> bool:
+        sort_key = self._values.get(key)
+        if sort_key is None:
+            return False
+        update, _ = self._path(sort_key)
+        node = update[0].next[0]
+        for i in range(self._level):
+            prev = update[i]
+            if prev.next[i] is node:
+                prev.width[i] += node.width[i] - 1
+                prev.next[i] = node.next[i]
+            else:
+                prev.width[i] -= 1
+        del self._values[key]
+        return True
+
+    def rank(self, key) -> Optional[int]:
+        """0-based position of key, None if absent."""
+        sort_key = self._values.get(key)
+        if sort_key is None:
+            return None
+        _, ranks = self._path(sort_key)
+        return ranks[0] + 1
+
+    def count_above(self, value: float) -> int:
+        """Number of entries with a strictly higher value."""
+        return self._path((value, -1))[1][0] + 1
+
+    def _nth_node(self, index: int) -> Optional[_Node]:
+        if not 0 <= index < len(self._values):
+            return None
+        node = self._head
+        pos = -1
+        for level in range(self._level - 1, -1, -1):
+            while node.next[level] is not None and pos + node.width[level] <= index:
+                pos += node.width[level]
+                node = node.next[level]
+        return node
+
+    def nth(self, index: int) -> Optional[Tuple[Hashable, float]]:
+        node = self._nth_node(index)
+        return None if node is None else (node.key, node.value)
+
+    def slice(self, start: int, stop: int) -> List[Tuple[Hashable, float]]:
+        start = max(start, 0)
+        node = self._nth_node(start)
+        result = []
+        while node is not None and start < stop:
+            result.append((node.key, node.value))
+            node = node.next[0]
+            start += 1
+        return result
+
+    def top(self, n: int) -> List[Tuple[Hashable, float]]:
+        return self.slice(0, n)
+
+    def around(self, key, n: int) -> List[Tuple[Hashable, float]]:
+        """Up to n entries on each side of key, key included."""
+        r = self.rank(key)
+        if r is None:
+            return []
+        return self.slice(r - n, r + n + 1)
+
+# Buckets keep the sign, the exponent and the top BUCKET_BITS mantissa bits
+# of a value, so a bucket spans 1/2**BUCKET_BITS of its magnitude and there
+# are at most a few thousand of them for any realistic range of values.
+BUCKET_BITS = 8
+_BUCKET_SHIFT = 52 - BUCKET_BITS
+_SIGN = 1 << 63
+
+def _order_key(value: float) -> int:
+    """Integer in the same order as the float value."""
+    bits = unpack('<Q', pack('<d', value))[0]
+    return -(bits ^ _SIGN) if bits & _SIGN else bits
+
+def _bucket(value: float) -> int:
+    return _order_key(value) >> _BUCKET_SHIFT
+
+def _bucket_start(bucket: int) -> float:
+    """Lowest value in bucket."""
+    key = bucket << _BUCKET_SHIFT
+    return unpack('<d', pack('<Q', key if key >= 0 else -key | _SIGN))[0]
+
+class OfflineStats:
+    """Persisted (key, value) rows in SQLite, queried through an index on value.
+
+    top and around are index range scans (O(log n + k)). A COUNT over the
+    index is O(rows above), so count_above also keeps the number of rows in
+    each value bucket in a second table, updated by put: it sums the buckets
+    above the value and counts rows only inside the value's own bucket.
+    """
+
+    def __init__(self, path: str, table: str = 'stats'):
+        self.table = table
+        self._counts = table + '_counts'
+        self._db = sqlite3.connect(path)
+        self._db.execute('CREATE TABLE IF NOT EXISTS %s (key TEXT PRIMARY KEY, value REAL NOT NULL)' % table)
+        self._db.execute('CREATE INDEX IF NOT EXISTS %s_value ON %s (value DESC)' % (table, table))
+        exists = self._db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self._counts,)).fetchone()
+        if not exists:
+            # Stores written before the counts table existed are counted once, in SQL
+            self._db.create_function('rank_bucket', 1, _bucket)
+            self._db.execute('CREATE TABLE %s (bucket INTEGER PRIMARY KEY, n INTEGER NOT NULL)' % self._counts)
+            self._db.execute('INSERT INTO %s SELECT rank_bucket(value), COUNT(*) FROM %s GROUP BY 1' % (self._counts, table))
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[float]:
+        row = self._db.execute('SELECT value FROM %s WHERE key = ?' % self.table, (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def _count(self, deltas: Dict[int, int], key: str, value: float) -> None:
+        old = self.get(key)
+        if old is not None:
+            deltas[_bucket(old)] -= 1
+        deltas[_bucket(value)] += 1
+
+    def _apply(self, deltas: Dict[int, int]) -> None:
+        rows = [(n, bucket) for bucket, n in deltas.items() if n]
+        self._db.executemany('INSERT OR IGNORE INTO %s (bucket, n) VALUES (?, 0)' % self._counts, [(bucket,) for _, bucket in rows])
+        self._db.executemany('UPDATE %s SET n = n + ? WHERE bucket = ?' % self._counts, rows)
+
+    def put(self, key: str, value: float) -> None:
+        deltas = defaultdict(int) # type: Dict[int, int]
+        self._count(deltas, key, value)
+        self._apply(deltas)
+        self._db.execute('INSERT OR REPLACE INTO %s (key, value) VALUES (?, ?)' % self.table, (key, value))
+
+    def put_many(self, rows) -> None:
+        rows = dict(rows) # the last value of a key wins, as with INSERT OR REPLACE
+        deltas = defaultdict(int) # type: Dict[int, int]
+        for key, value in rows.items():
+            self._count(deltas, key, value)
+        self._apply(deltas)
+        self._db.executemany('INSERT OR REPLACE INTO %s (key, value) VALUES (?, ?)' % self.table, rows.items())
+
+    def commit(self) -> None:
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.commit()
+        self._db.close()
+
+    def count_above(self, value: float) -> int:
+        bucket = _bucket(value)
+        above = self._db.execute('SELECT SUM(n) FROM %s WHERE bucket > ?' % self._counts, (bucket,)).fetchone()[0] or 0
+        inside = self._db.execute('SELECT COUNT(*) FROM %s WHERE value > ? AND value < ?' % self.table,
+                                  (value, _bucket_start(bucket + 1))).fetchone()[0]
+        return above + inside
+
+    def top(self, n: int, offset: int = 0) -> List[Tuple[str, float]]:
+        return self._db.execute('SELECT key, value FROM %s ORDER BY value DESC LIMIT ? OFFSET ?' % self.table, (n, offset)).fetchall()
+
+    def above(self, value: float, n: int) -> List[Tuple[str, float]]:
+        """n rows just above value, nearest first."""
+        return self._db.execute('SELECT key, value FROM %s WHERE value > ? ORDER BY value ASC LIMIT ?' % self.table, (value, n)).fetchall()
+
+    def below(self, value: float, n: int) -> List[Tuple[str, float]]:
+        return self._db.execute('SELECT key, value FROM %s WHERE value <= ? ORDER BY value DESC LIMIT ?' % self.table, (value, n)).fetchall()
+
+class Leaderboard:
+    """Online players in a RankIndex merged with offline rows in OfflineStats.
+
+    Online players are keyed by their persistent key (e.g. UID); while online,
+    their stored row is stale and skipped in merged queries.
+    """
+
+    def __init__(self, store: Optional[OfflineStats] = None):
+        self.online = RankIndex()
+        self.store = store
+        self._stored = {} # type: Dict[str, Optional[float]]
+
+    def connect(self, key: str, value: Optional[float] = None) -> None:
+        stored = self.store.get(key) if self.store is not None else None
+        self._stored[key] = stored
+        if value is None:
+            value = stored or 0
+        self.online.update(key, value)
+
+    def disconnect(self, key: str) -> None:
+        value = self.online.value(key)
+        if value is None:
+            return
+        if self.store is not None:
+            self.store.put(key, value)
+            self.store.commit()
+        self.online.remove(key)
+        self._stored.pop(key, None)
+
+    def update(self, key: str, value: float) -> None:
+        self.online.update(key, value)
+
+    def add(self, key: str, delta: float) -> None:
+        self.online.add(key, delta)
+
+    def _stale_above(self, value: float) -> int:
+        return sum(1 for v in self._stored.values() if v is not None and v > value)
+
+    def rank(self, key: str) -> Optional[int]:
+        """0-based rank among online and offline players."""
+        r = self.online.rank(key)
+        if r is None or self.store is None:
+            return r
+        value = self.online.value(key)
+        return r + self.store.count_above(value) - self._stale_above(value)
+
+    def top(self, n: int) -> List[Tuple[str, float]]:
+        result = self.online.top(n)
+        if self.store is not None:
+            result += [row for row in self.store.top(n + len(self._stored)) if row[0] not in self._stored]
+            result.sort(key=lambda row: -row[1])
+        return result[:n]
+
+    def around(self, key: str, n: int) -> List[Tuple[str, float]]:
+        """Up to n players on each side of key, key included."""
+        value = self.online.value(key)
+        if value is None:
+            return []
+        result = self.online.around(key, n)
+        if self.store is not None:
+            extra = len(self._stored)
+            result += [row for row in self.store.above(value, n + extra) if row[0] not in self._stored]
+            result += [row for row in self.store.below(value, n + extra) if row[0] not in self._stored]
+            result.sort(key=lambda row: -row[1])
+            i = next(i for i, row in enumerate(result) if row[0] == key)
+            result = result[max(i - n, 0):i + n + 1]
+        return result
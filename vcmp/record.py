@@ -0,0 +1,224 @@
+# pylint: disable=missing-docstring
+
+import traceback
+from io import BytesIO
+from struct import Struct
+from time import monotonic
+from typing import Any, BinaryIO, Iterator, Tuple
+
+MAGIC = b'VCMPREC1'
+
+# Record types
+REC_NAME = 0 # name id, name: names are interned on first use
+REC_CALLBACK = 1 # name id, args tuple
+REC_RETURN = 2 # name id, value
+
+# Value tags
+_NONE, _FALSE, _TRUE, _INT, _NEG, _F32, _F64, _STR, _BYTES, _TUPLE, _DICT = range(11)
+
+RECORDED_PREFIXES = ('get_', 'is_', 'exists_', 'find_', 'create_', 'add_')
+
+struct_float = Struct('<f')
+struct_double = Struct('<d')
+
+def _write_uint(out: BytesIO, n: int) -> None:
+    while n > 0x7f:
+        out.write(bytes(((n & 0x7f) | 0x80,)))
+        n >>= 7
+    out.write(bytes((n,)))
+
+def _read_uint(f: BinaryIO) -> int:
+    n = shift = 0
+    while True:
+        b = f.read(1)
+        if not b:
+            raise EOFError
+        n |= (b[0] & 0x7f) << shift
+        if b[0] < 0x80:
+            return n
+        shift += 7
+
+def _read_exact(f: BinaryIO, n: int) -> bytes:
+    data = f.read(n)
+    if len(data) != n:
+        raise EOFError
+    return data
+
+def write_value(out: BytesIO, v: Any) -> None:
+    if v is None:
+        out.write(bytes((_NONE,)))
+    elif v is True:
+        out.write(bytes((_TRUE,)))
+    elif v is False:
+        out.write(bytes((_FALSE,)))
+    elif isinstance(v, int):
+        out.write(bytes((_INT if v >= 0 else _NEG,)))
+        _write_uint(out, abs(v))
+    elif isinstance(v, float):
+        try:
+            f = struct_float.pack(v)
+        except OverflowError: # beyond float32 range
+            f = None
+        if f is not None and struct_float.unpack(f)[0] == v:
+            out.write(bytes((_F32,)) + f)
+        else:
+            out.write(bytes((_F64,)) + struct_double.pack(v))
+    elif isinstance(v, str):
+        v = v.encode('utf-8')
+        out.write(bytes((_STR,)))
+        _write_uint(out, len(v))
+        out.write(v)
+    elif isinstance(v, (bytes, bytearray)):
+        out.write(bytes((_BYTES,)))
+        _write_uint(out, len(v))
+        out.write(v)
+    elif isinstance(v, (tuple, list)):
+        out.write(bytes((_TUPLE,)))
+        _write_uint(out, len(v))
+        for i in v:
+            write_value(out, i)
+    elif isinstance(v, dict):
+        out.write(bytes((_DICT,)))
+        _write_uint(out, len(v))
+        for k, i in v.items():
+            write_value(out, k)
+            write_value(out, i)
+    else:
+        raise TypeError('cannot record %r' % type(v))
+
+def read_value(f: BinaryIO) -> Any:
+    tag = f.read(1)
+    if not tag:
+        raise EOFError
+    tag = tag[0]
+    if tag == _NONE:
+        return None
+    if tag == _TRUE:
+        return True
+    if tag == _FALSE:
+        return False
+    if tag == _INT:
+        return _read_uint(f)
+    if tag == _NEG:
+        return -_read_uint(f)
+    if tag == _F32:
+        return struct_float.unpack(_read_exact(f, 4))[0]
+    if tag == _F64:
+        return struct_double.unpack(_read_exact(f, 8))[0]
+    if tag == _STR:
+        return _read_exact(f, _read_uint(f)).decode('utf-8')
+    if tag == _BYTES:
+        return _read_exact(f, _read_uint(f))
+    if tag == _TUPLE:
+        return tuple(read_value(f) for _ in range(_read_uint(f)))
+    if tag == _DICT:
+        return {read_value(f): read_value(f) for _ in range(_read_uint(f))}
+    raise ValueError('bad value tag %d' % tag)
+
+class Recorder:
+    """Append-only binary log of callbacks and native getter results.
+
+    Records are buffered in memory and appended to the file when the buffer
+    exceeds `flush_size` bytes or `flush_interval` seconds have passed.
+    Recording never raises into the caller: a record that cannot be
+    serialised is dropped whole and a failed write drops the buffer; both
+    are counted in `errors` and the first one is printed.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0, flush_size: int = 1 << 16):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._buf = BytesIO()
+        self._names = {}
+        self._last_flush = monotonic()
+        self.errors = 0
+        with open(path, 'ab') as f:
+            if f.tell() == 0:
+                f.write(MAGIC)
+
+    def _name(self, name: str) -> int:
+        i = self._names.get(name)
+        if i is None:
+            i = self._names[name] = len(self._names)
+            self._buf.write(bytes((REC_NAME,)))
+            _write_uint(self._buf, i)
+            write_value(self._buf, name)
+        return i
+
+    def _error(self) -> None:
+        if not self.errors:
+            traceback.print_exc()
+        self.errors += 1
+
+    def _record(self, rec: int, name: str, value: Any) -> None:
+        # Serialise into a scratch buffer so a failure leaves no partial record
+        out = BytesIO()
+        try:
+            write_value(out, value)
+        except (TypeError, ValueError, OverflowError):
+            self._error()
+            return
+        i = self._name(name)
+        self._buf.write(bytes((rec,)))
+        _write_uint(self._buf, i)
+        self._buf.write(out.getvalue())
+
+    def callback(self, name: str, args: tuple) -> None:
+        self._record(REC_CALLBACK, name, args)
+        if self._buf.tell() >= self.flush_size or monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def result(self, name: str, value: Any) -> None:
+        self._record(REC_RETURN, name, value)
+
+    def flush(self) -> None:
+        self._last_flush = monotonic()
+        data = self._buf.getvalue()
+        if not data:
+            return
+        try:
+            with open(self.path, 'ab') as f:
+                f.write(data)
+        except OSError:
+            self._error()
+        self._buf = BytesIO()
+        # Names are interned per flushed chunk so a truncated log stays readable
+        self._names = {}
+
+def read_log(path: str) -> Iterator[Tuple[int, str, Any]]:
+    """Yield (record type, name, args or value) from a log written by Recorder."""
+    names = {}
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError('not a vcmp record log')
+        while True:
+            try:
+                rec = f.read(1)
+                if not rec:
+                    return
+                i = _read_uint(f)
+                value = read_value(f)
+            except (EOFError, ValueError):
+                return # torn tail after a crash
+            if rec[0] == REC_NAME:
+                names[i] = value
+            else:
+                yield rec[0], names[i], value
+
+def wrap_functions(functions, recorder: Recorder) -> dict:
+    """Record the results of native getters; returns the originals for restoring."""
+    originals = {}
+    for name in dir(functions):
+        if not name.startswith(RECORDED_PREFIXES):
+            continue
+        fn = getattr(functions, name)
+        if not callable(fn):
+            continue
+        originals[name] = fn
+        def wrapper(*args, _fn=fn, _name=name):
+            ret = _fn(*args)
+            recorder.result(_name, ret)
+            return ret
+        setattr(functions, name, wrapper)
+    return originals
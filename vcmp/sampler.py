@@ -0,0 +1,180 @@
+# pylint: disable=missing-docstring
+
+from array import array
+from math import sqrt
+from typing import List, Optional, Tuple
+
+from _vcmp import functions as func
+from .utils import MAX_PLAYERS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+Vector = Tuple[float, float, float]
+
+class FrameSampler:
+    """Column store of the state of every connected player.
+
+    Columns are array.array buffers indexed by player id; with NumPy they are
+    also exposed as zero-copy ndarray views (pos, speed, health, weapon, keys)
+    so queries over all players are single array operations.
+    """
+
+    def __init__(self, interval: float = 0.0):
+        self.interval = interval
+        self._elapsed = 0.0
+        self._connected = bytearray(MAX_PLAYERS)
+        self._ids = [] # type: List[int]
+        self._pos = array('f', bytes(MAX_PLAYERS * 3 * 4))
+        self._speed = array('f', bytes(MAX_PLAYERS * 3 * 4))
+        self._health = array('f', bytes(MAX_PLAYERS * 4))
+        self._weapon = array('i', bytes(MAX_PLAYERS * 4))
+        self._keys = array('i', bytes(MAX_PLAYERS * 4))
+        if np is not None:
+            self.pos = np.frombuffer(self._pos, dtype=np.float32).reshape(MAX_PLAYERS, 3)
+            self.speed = np.frombuffer(self._speed, dtype=np.float32).reshape(MAX_PLAYERS, 3)
+            self.health = np.frombuffer(self._health, dtype=np.float32)
+            self.weapon = np.frombuffer(self._weapon, dtype=np.int32)
+            self.keys = np.frombuffer(self._keys, dtype=np.int32)
+
+    # Connection tracking, so sampling never asks about empty slots
+
+    def connect(self, player_id: int) -> None:
+        if not self._connected[player_id]:
+            self._connected[player_id] = 1
+            self._ids = [i for i in range(MAX_PLAYERS) if self._connected[i]]
+
+    def disconnect(self, player_id: int) -> None:
+        if self._connected[player_id]:
+            self._connected[player_id] = 0
+            self._ids = [i for i in range(MAX_PLAYERS) if self._connected[i]]
+
+    @property
+    def ids(self) -> List[int]:
+        return self._ids
+
+    # Sampling
+
+    def on_frame(self, elapsed_time: float) -> bool:
+        self._elapsed += elapsed_time
+        if self._elapsed < self.interval:
+            return False
+        self._elapsed = 0.0
+        self.sample()
+        return True
+
+    def sample(self) -> None:
+        pos = self._pos
+        speed = self._speed
+        health = self._health
+        weapon = self._weapon
+        keys = self._keys
+        get_position = func.get_player_position
+        get_speed = func.get_player_speed
+        get_health = func.get_player_health
+        get_weapon = func.get_player_weapon
+        get_keys = func.get_player_game_keys
+        for i in self._ids:
+            j = i * 3
+            p = get_position(i)
+            if p is not None:
+                pos[j], pos[j + 1], pos[j + 2] = p
+            s = get_speed(i)
+            if s is not None:
+                speed[j], speed[j + 1], speed[j + 2] = s
+            health[i] = get_health(i)
+            weapon[i] = get_weapon(i)
+            keys[i] = get_keys(i)
+
+    def get_pos(self, player_id: int) -> Vector:
+        j = player_id * 3
+        return tuple(self._pos[j:j + 3])
+
+    def get_speed(self, player_id: int) -> Vector:
+        j = player_id * 3
+        return tuple(self._speed[j:j + 3])
+
+    # Queries, all returning player ids
+
+    def within(self, center: Vector, radius: float) -> List[int]:
+        ids = self._ids
+        if np is not None:
+            d = self.pos[ids] - np.asarray(center, dtype=np.float32)
+            return [ids[i] for i in np.flatnonzero(np.einsum('ij,ij->i', d, d) <= radius * radius)]
+        x, y, z = center
+        pos = self._pos
+        r2 = radius * radius
+        return [i for i in ids if (pos[i * 3] - x) ** 2 + (pos[i * 3 + 1] - y) ** 2 + (pos[i * 3 + 2] - z) ** 2 <= r2]
+
+    def with_keys(self, mask: int) -> List[int]:
+        ids = self._ids
+        if np is not None:
+            return [ids[i] for i in np.flatnonzero((self.keys[ids] & mask) == mask)]
+        keys = self._keys
+        return [i for i in ids if keys[i] & mask == mask]
+
+    def with_weapon(self, weapon: int) -> List[int]:
+        ids = self._ids
+        if np is not None:
+            return [ids[i] for i in np.flatnonzero(self.weapon[ids] == weapon)]
+        return [i for i in ids if self._weapon[i] == weapon]
+
+    def health_below(self, value: float) -> List[int]:
+        ids = self._ids
+        if np is not None:
+            return [ids[i] for i in np.flatnonzero(self.health[ids] < value)]
+        return [i for i in ids if self._health[i] < value]
+
+    def speeds(self):
+        """Speed magnitude of every connected player, in ids order."""
+        ids = self._ids
+        if np is not None:
+            return np.linalg.norm(self.speed[ids], axis=1)
+        speed = self._speed
+        return array('f', (sqrt(speed[i * 3] ** 2 + speed[i * 3 + 1] ** 2 + speed[i * 3 + 2] ** 2) for i in ids))
+
+    def speed_outliers(self, k: float = 3.0, minimum: float = 0.0) -> List[int]:
+        """Players faster than mean + k standard deviations (and than minimum)."""
+        ids = self._ids
+        if len(ids) < 2:
+            return []
+        speeds = self.speeds()
+        if np is not None:
+            limit = max(minimum, float(speeds.mean() + k * speeds.std()))
+            return [ids[i] for i in np.flatnonzero(speeds > limit)]
+        mean = sum(speeds) / len(speeds)
+        std = sqrt(sum((s - mean) ** 2 for s in speeds) / len(speeds))
+        limit = max(minimum, mean + k * std)
+        return [i for i, s in zip(ids, speeds) if s > limit]
+
+    def distances(self):
+        """Pairwise distance matrix of connected players, rows and columns in ids order."""
+        ids = self._ids
+        if np is not None:
+            p = self.pos[ids]
+            d = p[:, None, :] - p[None, :, :]
+            return np.sqrt(np.einsum('ijk,ijk->ij', d, d))
+        pos = [self.get_pos(i) for i in ids]
+        return [[sqrt((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2) for b in pos] for a in pos]
+
+    def pairs_within(self, radius: float) -> List[Tuple[int, int]]:
+        ids = self._ids
+        if np is not None:
+            a, b = np.nonzero(np.triu(self.distances() <= radius, 1))
+            return [(ids[i], ids[j]) for i, j in zip(a, b)]
+        d = self.distances()
+        n = len(ids)
+        return [(ids[i], ids[j]) for i in range(n) for j in range(i + 1, n) if d[i][j] <= radius]
+
+    def nearest(self, player_id: int, candidates: Optional[List[int]] = None) -> Optional[int]:
+        ids = [i for i in (self._ids if candidates is None else candidates) if i != player_id]
+        if not ids:
+            return None
+        x, y, z = self.get_pos(player_id)
+        if np is not None:
+            d = self.pos[ids] - np.array((x, y, z), dtype=np.float32)
+            return ids[int(np.argmin(np.einsum('ij,ij->i', d, d)))]
+        pos = self._pos
+        return min(ids, key=lambda i: (pos[i * 3] - x) ** 2 + (pos[i * 3 + 1] - y) ** 2 + (pos[i * 3 + 2] - z) ** 2)
@@ -0,0 +1,151 @@
+# pylint: disable=missing-docstring
+
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from _vcmp import functions as func
+from .utils import MAX_CHECK_POINTS, MAX_PICKUPS
+
+# Op targets: the triggering player, or the vehicle they are in
+PLAYER = 0
+VEHICLE = 1
+
+# Op: (target, fn, args), called as fn(target_id, *args)
+Op = Tuple[int, Callable, tuple]
+
+# Native setters that overwrite state, with the number of leading args that
+# pick which part (e.g. the option of set_player_option): a later call only
+# overwrites an earlier one with the same key args
+_SETTERS = {
+    'set_player_world': 0, 'set_player_secondary_world': 0, 'set_player_team': 0, 'set_player_skin': 0,
+    'set_player_colour': 0, 'set_player_money': 0, 'set_player_score': 0, 'set_player_wanted_level': 0,
+    'set_player_health': 0, 'set_player_armour': 0, 'set_player_immunity_flags': 0, 'set_player_position': 0,
+    'set_player_speed': 0, 'set_player_heading': 0, 'set_player_alpha': 0, 'set_player_weapon_slot': 0,
+    'set_player_option': 1,
+    'set_vehicle_world': 0, 'set_vehicle_immunity_flags': 0, 'set_vehicle_position': 0, 'set_vehicle_rotation': 0,
+    'set_vehicle_rotation_euler': 0, 'set_vehicle_speed': 0, 'set_vehicle_turn_speed': 0, 'set_vehicle_health': 0,
+    'set_vehicle_colour': 0, 'set_vehicle_damage_data': 0, 'set_vehicle_radio': 0, 'set_vehicle_lights_data': 0,
+    'set_vehicle_option': 1, 'set_vehicle_part_status': 1, 'set_vehicle_tyre_status': 1, 'set_inst_handling_rule': 1,
+}
+
+# Setters with an `add` or `remove_occupants` flag (index into args) only
+# overwrite when it is False
+_FLAG_ARG = {'set_vehicle_speed': 3, 'set_vehicle_turn_speed': 3, 'set_vehicle_position': 3}
+
+def _setter_key(fn: Callable, args: tuple) -> Optional[tuple]:
+    """(fn, key args) for an overwriting native setter, otherwise None."""
+    name = getattr(fn, '__name__', '')
+    keys = _SETTERS.get(name)
+    if keys is None or getattr(func, name, None) is not fn:
+        return None
+    i = _FLAG_ARG.get(name)
+    if i is not None and args[i]:
+        return None
+    return (fn, args[:keys])
+
+def compile_ops(ops: Sequence[Sequence]) -> Tuple[Op, ...]:
+    """Normalise ops to (target, fn, args), dropping native setters overwritten right away.
+
+    A setter is dropped when the same setter, with the same key args, is
+    called again on the same target and only calls to that setter come in
+    between. Nothing moves past any other call, so e.g. a speed reset before
+    and after a position change both stay where they are.
+    """
+    ops = [(op[0], op[1], tuple(op[2]) if len(op) > 2 else ()) for op in ops]
+    result = []
+    run = None
+    later = set()
+    for target, fn, args in reversed(ops):
+        key = _setter_key(fn, args)
+        if key is None or (target, fn) != run:
+            run = None if key is None else (target, fn)
+            later.clear()
+        elif key in later:
+            continue
+        if key is not None:
+            later.add(key)
+        result.append((target, fn, args))
+    result.reverse()
+    return tuple(result)
+
+class Action:
+    """Prebuilt ops for a trigger.
+
+    Without in_vehicle the ops run whether or not the player is in a
+    vehicle, and may only target PLAYER. With it, on_foot and in_vehicle
+    are separate branches, picked with one get_player_vehicle_id call.
+    """
+    __slots__ = ('on_foot', 'in_vehicle', 'needs_vehicle')
+
+    def __init__(self, on_foot: Sequence[Sequence] = (), in_vehicle: Optional[Sequence[Sequence]] = None):
+        self.on_foot = compile_ops(on_foot)
+        self.needs_vehicle = in_vehicle is not None
+        self.in_vehicle = compile_ops(in_vehicle) if self.needs_vehicle else self.on_foot
+        if any(op[0] == VEHICLE for op in self.on_foot):
+            raise ValueError('on_foot ops cannot target the vehicle')
+
+    def __len__(self):
+        return max(len(self.on_foot), len(self.in_vehicle))
+
+    def run(self, player_id: int) -> None:
+        vehicle_id = 0
+        ops = self.on_foot
+        if self.needs_vehicle:
+            vehicle_id = func.get_player_vehicle_id(player_id)
+            if vehicle_id:
+                ops = self.in_vehicle
+        for target, fn, args in ops:
+            fn(vehicle_id if target else player_id, *args)
+
+class Triggers:
+    """Checkpoint and pickup actions in arrays indexed by entity id.
+
+    Events dispatch with one index and one call per op; nothing is looked
+    up by key. Pickups can also have an allow(pickup_id, player_id)
+    predicate answering on_pickup_pick_attempt.
+    """
+
+    def __init__(self):
+        self._entered = [None] * MAX_CHECK_POINTS # type: List[Optional[Action]]
+        self._exited = [None] * MAX_CHECK_POINTS # type: List[Optional[Action]]
+        self._picked = [None] * MAX_PICKUPS # type: List[Optional[Action]]
+        self._allow = [None] * MAX_PICKUPS # type: List[Optional[Callable[[int, int], bool]]]
+
+    def set_check_point(self, check_point_id: int, enter: Optional[Action] = None, exit: Optional[Action] = None) -> None: # pylint: disable=redefined-builtin
+        if not 0 <= check_point_id < MAX_CHECK_POINTS:
+            raise ValueError('invalid check point id %d' % check_point_id)
+        self._entered[check_point_id] = enter
+        self._exited[check_point_id] = exit
+
+    def set_pickup(self, pickup_id: int, pick: Optional[Action] = None,
+                   allow: Optional[Callable[[int, int], bool]] = None) -> None:
+        if not 0 <= pickup_id < MAX_PICKUPS:
+            raise ValueError('invalid pickup id %d' % pickup_id)
+        self._picked[pickup_id] = pick
+        self._allow[pickup_id] = allow
+
+    def remove_check_point(self, check_point_id: int) -> None:
+        self.set_check_point(check_point_id)
+
+    def remove_pickup(self, pickup_id: int) -> None:
+        self.set_pickup(pickup_id)
+
+    # Event handlers
+
+    def check_point_entered(self, check_point_id: int, player_id: int) -> None:
+        action = self._entered[check_point_id]
+        if action is not None:
+            action.run(player_id)
+
+    def check_point_exited(self, check_point_id: int, player_id: int) -> None:
+        action = self._exited[check_point_id]
+        if action is not None:
+            action.run(player_id)
+
+    def pickup_pick_attempt(self, pickup_id: int, player_id: int) -> bool:
+        allow = self._allow[pickup_id]
+        return True if allow is None else bool(allow(pickup_id, player_id))
+
+    def pickup_picked(self, pickup_id: int, player_id: int) -> None:
+        action = self._picked[pickup_id]
+        if action is not None:
+            action.run(player_id)
@@ -1,4 +1,7 @@
 MAX_PLAYERS = 100
+MAX_VEHICLES = 1000
+MAX_PICKUPS = 2000
+MAX_CHECK_POINTS = 2000
 
 def RGB(r=0, g=0, b=0):
     return r << 16 | g << 8 | b